@@ -0,0 +1,58 @@
+"""
+Benchmark of `get` and `set_value_from_var_column` on a synthetic
+snapshot of 1M rows, with and without the (scenario, variable) index.
+
+Usage: python -m benchmarks.bench_get
+"""
+
+import time
+import numpy as np
+import pandas as pd
+
+from utils.data.handling import get, set_value_from_var_column, build_index
+from benchmarks.synthetic import preprocessed_snapshot
+
+N_CALLS = 20
+
+
+def time_calls(data, meta):
+    start = time.perf_counter()
+    for i in range(N_CALLS):
+        get(data, "diag-c80-gr5", "Final Energy", "2050")
+    t_get = (time.perf_counter() - start) / N_CALLS
+
+    start = time.perf_counter()
+    set_value_from_var_column(data, meta, "GDP_metric", "GDP", "2050", "diag-base")
+    t_set = time.perf_counter() - start
+    return t_get, t_set
+
+
+def main():
+    data = preprocessed_snapshot(n_models=50, n_scenarios=200, n_variables=100)
+    meta = pd.DataFrame(
+        {"GDP_metric": np.where(np.arange(50) % 2, "GDP|PPP", "GDP|MER")},
+        index=pd.Index(data["Model"].unique(), name="Model"),
+    )
+    print(f"Synthetic snapshot: {len(data):,} rows")
+
+    get_scan, set_scan = time_calls(data, meta)
+
+    start = time.perf_counter()
+    index = build_index(data)
+    t_build = time.perf_counter() - start
+    get_index, set_index = time_calls(index, meta)
+
+    print(f"Building index:  {t_build:8.3f} s")
+    print(f"{'':28}{'scan':>10}{'index':>10}{'speedup':>10}")
+    for label, t_scan, t_index in [
+        ("get (per call)", get_scan, get_index),
+        ("set_value_from_var_column", set_scan, set_index),
+    ]:
+        print(
+            f"{label:28}{t_scan * 1e3:8.1f}ms{t_index * 1e3:8.1f}ms"
+            f"{t_scan / t_index:9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
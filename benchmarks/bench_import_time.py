@@ -0,0 +1,49 @@
+"""
+Import time of the calculation code, with and without the plotting code.
+Each import is timed in a fresh Python process.
+
+Usage: python -m benchmarks.bench_import_time
+"""
+
+import sys
+import subprocess
+
+N_REPEATS = 5
+
+STATEMENTS = {
+    "pandas (baseline)": "import pandas",
+    "create_columns only": "from utils.indicators.relative_abatement_index "
+    "import create_columns",
+    "engine (all indicators)": "from utils.indicators.engine import create_all_columns",
+    "create_fig": "from utils.indicators.relative_abatement_index import create_fig; "
+    "import plotly.graph_objects",
+}
+
+
+def time_import(statement):
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"{statement}; "
+        "print(time.perf_counter() - start, 'plotly' in sys.modules)"
+    )
+    durations = []
+    for _ in range(N_REPEATS):
+        output = subprocess.run(
+            [sys.executable, "-c", "import sys; " + code],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        durations.append(float(output[0]))
+    return min(durations), output[1] == "True"
+
+
+def main():
+    print(f"{'':28}{'import time':>12}{'plotly loaded':>15}")
+    for label, statement in STATEMENTS.items():
+        duration, plotly_loaded = time_import(statement)
+        print(f"{label:28}{duration * 1000:10.0f}ms{str(plotly_loaded):>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark of the full pipeline on synthetic snapshots of 10, 100 and 1000
+times the size of the NAVIGATE snapshot. For each stage (`import_data`,
+`create_meta_df`, the `create_columns` of each indicator, `create_all_columns`
+and the `create_fig` of each indicator) the wall time and the peak memory
+allocated during the stage (tracemalloc) are reported.
+
+The results can be written to a JSON file, and compared to an earlier run
+(time and peak memory) to make regressions visible:
+
+Usage: python -m benchmarks.bench_pipeline [scale ...] [--json out.json]
+           [--compare previous.json]
+"""
+
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+import warnings
+import tracemalloc
+import contextlib
+
+from utils.data.prepocessing import import_data
+from utils.data.meta import create_meta_df, create_model_df
+from utils.indicators.engine import INDICATORS, create_all_columns
+from benchmarks.synthetic import (
+    scaled_snapshot_kwargs,
+    write_snapshot,
+    write_versions,
+)
+
+# Time a stage a few times if it is fast, and keep the fastest
+MIN_DURATION = 1.0
+MAX_REPEATS = 5
+
+
+def measure(function, *args, **kwargs):
+    """
+    Returns the result of the first call, the shortest wall time and the peak
+    memory (bytes) allocated during a call. The memory is measured in a
+    separate call, since tracemalloc slows down the traced code. Printed
+    output and warnings are hidden.
+    """
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return _measure(function, *args, **kwargs)
+
+
+def _measure(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    durations = [time.perf_counter() - start]
+
+    while sum(durations) < MIN_DURATION and len(durations) < MAX_REPEATS:
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(durations), peak
+
+
+def run_scale(scale, folder):
+    """
+    Runs all stages on a snapshot of `scale` times the NAVIGATE snapshot.
+    Returns a dictionary of stage -> {"time": seconds, "peak_memory": bytes}
+    """
+    snapshot_kwargs = scaled_snapshot_kwargs(scale)
+    data_filename = os.path.join(folder, f"snapshot_{scale}.csv")
+    versions_filename = os.path.join(folder, f"versions_{scale}.xlsx")
+    write_versions(versions_filename, write_snapshot(data_filename, **snapshot_kwargs))
+
+    results = {}
+
+    def stage(label, function, *args, **kwargs):
+        result, duration, peak = measure(function, *args, **kwargs)
+        results[label] = {"time": duration, "peak_memory": peak}
+        return result
+
+    data = stage("import_data", import_data, data_filename)
+    results["import_data"]["rows"] = len(data)
+    meta = stage("create_meta_df", create_meta_df, data, versions_filename)
+
+    full_meta = meta
+    for name, module in INDICATORS.items():
+        full_meta = stage(
+            f"create_columns {name}", module.create_columns, data, full_meta, mute=True
+        )
+    stage("create_all_columns", create_all_columns, data, meta, mute=True)
+
+    models = create_model_df(full_meta)
+    for name, module in INDICATORS.items():
+        stage(f"create_fig {name}", module.create_fig, full_meta, models, "2050")
+
+    return results
+
+
+def print_results(results, previous=None):
+    """
+    With `previous` results, the time and peak memory are also given relative
+    to the previous run
+    """
+    print(
+        f"{'':28}{'time':>10}{'peak mem':>12}"
+        f"{'time vs previous':>19}{'mem vs previous':>18}"
+    )
+    for label, result in results.items():
+        line = f"{label:28}{result['time']:9.3f}s{result['peak_memory'] / 1e6:9.0f} MB"
+        if previous is not None and label in previous:
+            line += f"{result['time'] / previous[label]['time']:18.2f}x"
+            line += f"{result['peak_memory'] / previous[label]['peak_memory']:17.2f}x"
+        print(line)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_pipeline")
+    parser.add_argument("scales", nargs="*", type=int, default=[10, 100, 1000])
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results of a previous run (JSON file)")
+    args = parser.parse_args(args)
+
+    previous = {}
+    if args.compare is not None:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    all_results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for scale in args.scales:
+            results = run_scale(scale, folder)
+            all_results[str(scale)] = results
+            print(
+                f"\nScale {scale}x: {results['import_data']['rows']:,} rows "
+                "after import"
+            )
+            print_results(results, previous.get(str(scale)))
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(all_results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark of reading a snapshot (`_prepare_data`, World region only), in one go
+and in chunks. Reports the wall time and the peak memory allocated while reading
+(measured with tracemalloc, which includes the NumPy buffers).
+
+Usage: python -m benchmarks.bench_read_csv [n_rows]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+from utils.data.prepocessing import _prepare_data
+from benchmarks.synthetic import write_snapshot
+
+
+def measure(filename, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = _prepare_data(filename, sep=";", onlyworld=True, **kwargs)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak, data.memory_usage(deep=True).sum()
+
+
+def main(n_rows=500_000):
+    n_models = max(1, n_rows // (5 * 6 * 100))
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "snapshot.csv")
+        write_snapshot(
+            filename, n_models=n_models, n_scenarios=5, n_variables=100, n_regions=6
+        )
+        print(f"Synthetic snapshot: {os.path.getsize(filename) / 1e6:.0f} MB")
+
+        print(f"{'':20}{'time':>10}{'peak mem':>12}{'result':>12}")
+        for label, kwargs in [
+            ("read_csv", {}),
+            ("chunksize=100000", {"chunksize": 100_000}),
+        ]:
+            duration, peak, size = measure(filename, **kwargs)
+            print(f"{label:20}{duration:9.2f}s{peak / 1e6:9.0f} MB{size / 1e6:9.0f} MB")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,178 @@
+"""
+Synthetic IAMC snapshots for benchmarking
+
+Generates data in the same layout as the NAVIGATE snapshot
+(Model;Scenario;Region;Variable;Unit;2010;2015;...;2100, with values
+only for the decadal years), but with an arbitrary number of rows.
+
+ - synthetic_snapshot: raw snapshot (as read from the csv file)
+ - scaled_snapshot_kwargs: size of a snapshot `scale` times the NAVIGATE one
+ - preprocessed_snapshot: in the format returned by `import_data`
+ - synthetic_versions / synthetic_meta: model versions file and meta dataframe
+"""
+
+import numpy as np
+import pandas as pd
+
+INDICATOR_VARIABLES = {
+    "Emissions|CO2|Energy and Industrial Processes": "Mt CO2/yr",
+    "Emissions|Kyoto Gases": "Mt CO2-equiv/yr",
+    "Final Energy": "EJ/yr",
+    "GDP|PPP": "billion US$2010/yr",
+    "GDP|MER": "billion US$2010/yr",
+    "Policy Cost|Consumption Loss": "billion US$2010/yr",
+    "Price|Carbon": "US$2010/t CO2",
+    "Primary Energy|Fossil": "EJ/yr",
+    "Primary Energy|Fossil|w/o CCS": "EJ/yr",
+    "Primary Energy|Fossil|w/ CCS": "EJ/yr",
+    "Primary Energy|Nuclear": "EJ/yr",
+    "Primary Energy|Biomass": "EJ/yr",
+    "Primary Energy|Biomass|w/o CCS": "EJ/yr",
+    "Primary Energy|Biomass|w/ CCS": "EJ/yr",
+    "Primary Energy|Non-Biomass Renewables": "EJ/yr",
+}
+SCENARIOS = ["DIAG-Base", "DIAG-C30-gr5", "DIAG-C80-gr5"]
+YEARS = [str(y) for y in range(2010, 2101, 5)]
+
+
+REGIONS = ["World", "R5ASIA", "R5LAM", "R5MAF", "R5OECD90+EU", "R5REF"]
+
+# Number of different models (`create_model_df` has a colour for 17 models),
+# the other entries are versions of these models
+N_MODEL_NAMES = 17
+
+# Size of the NAVIGATE snapshot (about 11,000 rows). It has a single region:
+# with more regions, `import_data` (without `regions`) would merge the rows of
+# the other regions as duplicates.
+NAVIGATE_SIZE = {"n_models": 20, "n_scenarios": 6, "n_variables": 94, "n_regions": 1}
+
+
+def synthetic_snapshot(
+    n_models=20, n_scenarios=5, n_variables=100, n_regions=1, seed=0
+):
+    """
+    Returns a raw snapshot with n_models * n_scenarios * n_variables * n_regions
+    rows. The first scenarios and variables are the ones used by the indicators,
+    the remaining ones are filler.
+    """
+    rng = np.random.default_rng(seed)
+
+    scenarios = (SCENARIOS + [f"DIAG-Extra-{i}" for i in range(n_scenarios)])[
+        :n_scenarios
+    ]
+    variables = list(INDICATOR_VARIABLES) + [
+        f"Filler|Variable {i}" for i in range(n_variables)
+    ]
+    variables = variables[:n_variables]
+    units = [INDICATOR_VARIABLES.get(var, "EJ/yr") for var in variables]
+    models = [
+        f"Model {i % N_MODEL_NAMES} v{i // N_MODEL_NAMES + 1}" for i in range(n_models)
+    ]
+
+    regions = (REGIONS + [f"Region {i}" for i in range(n_regions)])[:n_regions]
+
+    n_per_model = n_scenarios * n_regions * n_variables
+    n = n_models * n_per_model
+    data = pd.DataFrame(
+        {
+            "Model": np.repeat(models, n_per_model),
+            "Scenario": np.tile(
+                np.repeat(scenarios, n_regions * n_variables), n_models
+            ),
+            "Region": np.tile(np.repeat(regions, n_variables), n_models * n_scenarios),
+            "Variable": np.tile(variables, n // n_variables),
+            "Unit": np.tile(units, n // n_variables),
+        }
+    )
+    values = 100 * rng.random((n, 1)) * np.linspace(1, 2, len(YEARS))
+    values[:, 1::2] = np.nan  # Only decadal values are reported
+    return pd.concat([data, pd.DataFrame(values, columns=YEARS)], axis=1)
+
+
+def scaled_snapshot_kwargs(scale):
+    """
+    Arguments for `synthetic_snapshot` for a snapshot with `scale` times as many
+    rows as the NAVIGATE snapshot. Models, scenarios and variables are scaled
+    by the same factor, the number of regions is kept.
+    """
+    factor = scale ** (1 / 3)
+    return {
+        key: value if key == "n_regions" else max(1, round(value * factor))
+        for key, value in NAVIGATE_SIZE.items()
+    }
+
+
+def write_snapshot(filename, **kwargs):
+    """
+    Writes a synthetic snapshot to a csv file, and returns it
+    """
+    data = synthetic_snapshot(**kwargs)
+    data.to_csv(filename, sep=";", index=False)
+    return data
+
+
+def preprocessed_snapshot(**kwargs):
+    """
+    Synthetic snapshot in the format returned by `import_data`
+    (without reading from disk).
+    """
+    data = synthetic_snapshot(**kwargs)
+    data = data.drop(columns=YEARS[1::2])
+    data["Scenario"] = data["Scenario"].str.lower()
+    data.insert(2, "Name", data["Model"] + " " + data["Scenario"])
+    years = data.loc[:, "2010":]
+    for year in range(2015, 2105, 10):
+        years[str(year)] = years[[str(year - 5), str(year + 5)]].mean(axis=1)
+    return pd.concat([data.loc[:, :"Unit"], years[YEARS]], axis=1)
+
+
+def synthetic_versions(data):
+    """
+    Model versions table (same columns as the model versions Excel file)
+    for the models in `data`
+    """
+    models = pd.Series(data["Model"].unique())
+    names = models.str.rsplit(" ", n=1).str[0]
+    versions = models.str.rsplit(" v", n=1).str[1].astype(int)
+    # Model types and metrics depend on the model, not on the version
+    n = pd.factorize(names)[0]
+    return pd.DataFrame(
+        {
+            "Model_versionname": models,
+            "Model_name": names,
+            "Age (1 = newest)": versions.groupby(names)
+            .rank(ascending=False)
+            .astype(int),
+            "Type": np.where(n % 3, "Energy system", "CGE"),
+            "Policy cost variable": "Policy Cost|Consumption Loss",
+            "Emissions_for_CAV": np.where(
+                n % 4,
+                "Emissions|CO2|Energy and Industrial Processes",
+                "Emissions|Kyoto Gases",
+            ),
+            "GDP_metric": np.where(n % 2, "GDP|PPP", "GDP|MER"),
+        }
+    )
+
+
+def write_versions(filename, data):
+    synthetic_versions(data).to_excel(filename, index=False)
+
+
+def synthetic_meta(data):
+    """
+    Meta dataframe (as returned by `create_meta_df`) for the models in `data`
+    """
+    meta = (
+        synthetic_versions(data)
+        .rename(
+            columns={
+                "Model_versionname": "Model",
+                "Model_name": "Stripped model",
+                "Age (1 = newest)": "Age",
+            }
+        )
+        .set_index("Model")
+    )
+    meta["Newest"] = meta["Age"] == 1
+    return meta
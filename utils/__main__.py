@@ -0,0 +1,182 @@
+"""
+Command line entry point: runs the diagnostics without the notebook
+
+    python -m utils navigate_snapshot.csv Model_Versions&Types.xlsx \
+        --excel "Indicator values.xlsx" --figures output
+
+Plotly is only imported when figures are requested. With --profile, the time
+and memory used by each stage are written to a JSON file.
+"""
+
+import argparse
+import pandas as pd
+
+from utils.data.meta import create_model_df
+from utils.data.bootstrap import bootstrap_percentiles, bootstrap_ellipses
+from utils.indicators.engine import INDICATORS, create_all_columns
+from utils.indicators.scenarios import create_scenario_table
+from utils.indicators.cost_abat_value.calculate import CARBON_PRICES
+from utils.pipeline import load_snapshot
+from utils.instrumentation import instrument
+
+# Indicators whose columns are also shown in the figures of another indicator
+FIGURE_INDICATORS = {"CAV": ["RAI"]}
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m utils", description="Calculate the diagnostic indicators"
+    )
+    parser.add_argument("snapshot", help="snapshot file (semicolon separated)")
+    parser.add_argument("versions", help="Excel file with model versions and types")
+    parser.add_argument(
+        "--rename",
+        action="append",
+        default=[],
+        metavar="OLD=NEW",
+        help="rename a model in the snapshot to match the versions file",
+    )
+    parser.add_argument(
+        "--indicators",
+        nargs="+",
+        choices=list(INDICATORS),
+        default=list(INDICATORS),
+        help="indicators to calculate (default: all). With --figures or "
+        "--dashboard, RAI is also calculated for the CAV figures",
+    )
+    parser.add_argument(
+        "--years", nargs="+", default=["2050", "2100"], help="years to calculate"
+    )
+    parser.add_argument(
+        "--regions",
+        nargs="+",
+        help='calculate the indicators for each of these regions ("all": every '
+        "region in the snapshot)",
+    )
+    parser.add_argument("--cache-dir", help="folder to cache the pre-processed data")
+    parser.add_argument("--excel", help="write the indicator values to this file")
+    parser.add_argument(
+        "--bootstrap",
+        metavar="FILE",
+        help="write bootstrap confidence intervals of the percentiles and "
+        "ellipses shown in the figures to FILE (Excel)",
+    )
+    parser.add_argument(
+        "--scenario-table",
+        metavar="FILE",
+        help="write the indicators of every policy scenario (compared to "
+        "diag-base) to FILE, as a long csv table",
+    )
+    parser.add_argument("--figures", metavar="DIR", help="write the figures to DIR")
+    parser.add_argument(
+        "--dashboard",
+        metavar="FILE",
+        help="write all figures to a single interactive HTML page FILE (plotly.js "
+        "is written next to it, shared by all dashboards in that folder)",
+    )
+    parser.add_argument(
+        "--figure-years",
+        nargs="+",
+        default=["2050", "2100"],
+        help="years to create figures for (2050 and 2100 are always calculated "
+        "when creating figures, as they are used in the left panels)",
+    )
+    parser.add_argument("--formats", nargs="+", default=["png", "pdf"])
+    parser.add_argument("--scale", type=float, default=4)
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write the time and memory used by each stage to FILE (JSON)",
+    )
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    if args.profile is None:
+        run(args)
+    else:
+        with instrument(args.profile) as report:
+            run(args)
+        print(report.summary().to_string())
+        print(f"Profile written to {args.profile}")
+
+
+def run(args):
+    renames = dict(rename.split("=", 1) for rename in args.rename)
+    regions = "all" if args.regions == ["all"] else args.regions
+    years = list(args.years)
+    indicators = list(args.indicators)
+    if args.figures is not None or args.dashboard is not None:
+        years += ["2050", "2100"] + args.figure_years
+        for name in args.indicators:
+            indicators += FIGURE_INDICATORS.get(name, [])
+    years = list(dict.fromkeys(years))
+    indicators = list(dict.fromkeys(indicators))
+
+    # The data and meta are shared by the indicators and the scenario table
+    data, base_meta = load_snapshot(
+        args.snapshot,
+        args.versions,
+        renames or None,
+        cache_dir=args.cache_dir,
+        regions=regions,
+    )
+    meta = create_all_columns(data, base_meta, indicators, years=years, mute=True)
+    reported_years = [year for year in years if year not in CARBON_PRICES]
+    if "CAV" in indicators and reported_years:
+        print(
+            f"CAV {', '.join(reported_years)}: no carbon price given, using the "
+            "carbon price reported by each model"
+        )
+
+    if args.excel is not None:
+        meta.to_excel(args.excel)
+        print(f"Indicator values written to {args.excel}")
+
+    if args.bootstrap is not None:
+        with pd.ExcelWriter(args.bootstrap) as writer:
+            bootstrap_percentiles(meta).to_excel(writer, sheet_name="Percentiles")
+            bootstrap_ellipses(meta).to_excel(writer, sheet_name="Ellipses")
+        print(f"Bootstrap confidence intervals written to {args.bootstrap}")
+
+    if args.scenario_table is not None:
+        table = create_scenario_table(
+            data, base_meta, indicators=args.indicators, years=args.years
+        )
+        table.to_csv(args.scenario_table, index=False)
+        print(f"Scenario table written to {args.scenario_table}")
+
+    if args.figures is not None or args.dashboard is not None:
+        # Only import Plotly (slow) when needed
+        from utils.plot.export import export_figures, export_dashboard
+
+        models = create_model_df(meta)
+        if args.regions is None:
+            metas = {"": meta}
+        else:
+            metas = {
+                f"{region}_": meta.xs(region, level="Region")
+                for region in meta.index.unique("Region")
+            }
+        figures = {
+            f"{name}_{prefix}{year}": INDICATORS[name].create_fig(
+                region_meta, models, year
+            )
+            for name in args.indicators
+            for prefix, region_meta in metas.items()
+            for year in args.figure_years
+        }
+        if args.figures is not None:
+            rendered = export_figures(
+                figures, args.figures, formats=args.formats, scale=args.scale
+            )
+            print(f"{len(rendered)} figure files written to {args.figures}")
+        if args.dashboard is not None:
+            export_dashboard(figures, args.dashboard)
+            print(f"Dashboard written to {args.dashboard}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Bootstrap confidence intervals of the ensemble statistics used in the figures
+
+ - bootstrap_percentiles: 16th, 50th and 84th percentile (shade and median line
+   of `add_model_comparison`) of each indicator column
+ - bootstrap_ellipses: mean, standard deviations and correlation (from which
+   `confidence_ellipse` is drawn) of pairs of indicator columns
+
+The models are resampled with replacement. All resamples (and all columns or
+pairs) are drawn and evaluated as one array, without looping over resamples.
+If meta is indexed by Model and Region, each region is resampled separately
+(as in the figures of each region), giving an extra Region index level.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns shown in the model comparison (right panel) of the indicator figures
+PERCENTILE_COLUMNS = r"^(RAI c80 \d{4} CO2 FFI|CoEI \d{4}|FFR \d{4}|CAV \d{4})$"
+
+# Columns of the ellipses in the CoEI and CAV figures
+ELLIPSE_PAIRS = [
+    (f"Carbon intensity {year}", f"Energy intensity {year}")
+    for year in ["2050", "2100"]
+] + [
+    (f"Policy cost {year} per GDP", f"RAI c80 {year} CO2 FFI")
+    for year in ["2050", "2100"]
+]
+
+# Limit on the number of sampled values held in memory at once
+MAX_BATCH_VALUES = 10_000_000
+
+
+def bootstrap_percentiles(
+    meta,
+    columns=None,
+    percentiles=(16, 50, 84),
+    n_resamples=2000,
+    confidence=0.95,
+    seed=0,
+):
+    """
+    Percentiles of each column of meta (default: the indicator columns of
+    the model comparisons, see PERCENTILE_COLUMNS), ignoring missing values,
+    with bootstrap confidence intervals.
+
+    Returns a dataframe indexed by (column, percentile), with columns
+    "estimate" (same as `meta[column].quantile`), "low" and "high".
+    """
+    if "Region" in meta.index.names:
+        return _per_region(
+            bootstrap_percentiles,
+            meta,
+            columns=columns,
+            percentiles=percentiles,
+            n_resamples=n_resamples,
+            confidence=confidence,
+            seed=seed,
+        )
+    if columns is None:
+        columns = meta.filter(regex=PERCENTILE_COLUMNS).columns
+    columns = list(columns)
+    q = np.asarray(percentiles, dtype=float) / 100
+    rng = np.random.default_rng(seed)
+
+    # Sorting moves the missing values of each column to the end
+    values = np.sort(meta[columns].to_numpy(dtype=float), axis=0)
+    counts = (~np.isnan(values)).sum(axis=0)
+    values = values[: max(counts.max(initial=0), 1)]
+    n_rows = len(values)
+
+    estimates = _sorted_quantiles(values[None], counts, q)[0]
+    low, high = np.full_like(estimates, np.nan), np.full_like(estimates, np.nan)
+
+    batch = max(1, MAX_BATCH_VALUES // (n_resamples * n_rows))
+    for start in range(0, len(columns), batch):
+        cols = slice(start, start + batch)
+        n = counts[cols]
+        # Row positions < count of each column: only non-missing values are drawn
+        draws = (rng.random((n_resamples, n_rows, len(n))) * n).astype(int)
+        samples = values[:, cols][draws, np.arange(len(n))]
+        samples[:, np.arange(n_rows)[:, None] >= n] = np.nan
+        resampled = _sorted_quantiles(np.sort(samples, axis=1), n, q)
+        low[:, cols], high[:, cols] = _interval(resampled, confidence)
+
+    index = pd.MultiIndex.from_product(
+        [columns, percentiles], names=["column", "percentile"]
+    )
+    return pd.DataFrame(
+        {"estimate": estimates.T.ravel(), "low": low.T.ravel(), "high": high.T.ravel()},
+        index=index,
+    )
+
+
+def bootstrap_ellipses(
+    meta, pairs=ELLIPSE_PAIRS, n_resamples=2000, confidence=0.95, seed=0
+):
+    """
+    Parameters of the confidence ellipse of each (x column, y column) pair,
+    using the models for which both values are available, with bootstrap
+    confidence intervals.
+
+    Returns a dataframe indexed by (x, y, parameter), with parameters
+    mu_x, mu_y, sigma_x, sigma_y and rho, and columns "estimate", "low"
+    and "high".
+    """
+    if "Region" in meta.index.names:
+        return _per_region(
+            bootstrap_ellipses,
+            meta,
+            pairs=pairs,
+            n_resamples=n_resamples,
+            confidence=confidence,
+            seed=seed,
+        )
+    pairs = [pair for pair in pairs if set(pair) <= set(meta.columns)]
+    rng = np.random.default_rng(seed)
+
+    # Values of each pair, with the rows where both are available first
+    x, y = (meta[[pair[i] for pair in pairs]].to_numpy(dtype=float).T for i in [0, 1])
+    valid = ~(np.isnan(x) | np.isnan(y))
+    order = np.argsort(~valid, axis=1, kind="stable")
+    x, y = np.take_along_axis(x, order, 1), np.take_along_axis(y, order, 1)
+    counts = valid.sum(axis=1)
+    n_rows = max(counts.max(initial=0), 1)
+    x, y = np.nan_to_num(x[:, :n_rows]), np.nan_to_num(y[:, :n_rows])
+
+    mask = np.arange(n_rows) < counts[:, None]
+    estimates = _ellipse_parameters(x[:, None], y[:, None], mask[:, None])[..., 0]
+
+    draws = (
+        rng.random((len(pairs), n_resamples, n_rows)) * counts[:, None, None]
+    ).astype(int)
+    resampled = _ellipse_parameters(
+        np.take_along_axis(x[:, None], draws, 2),
+        np.take_along_axis(y[:, None], draws, 2),
+        mask[:, None],
+    )
+    low, high = _interval(np.moveaxis(resampled, 2, 0), confidence)
+
+    parameters = ["mu_x", "mu_y", "sigma_x", "sigma_y", "rho"]
+    index = pd.MultiIndex.from_tuples(
+        [
+            (x_col, y_col, parameter)
+            for x_col, y_col in pairs
+            for parameter in parameters
+        ],
+        names=["x", "y", "parameter"],
+    )
+    return pd.DataFrame(
+        {"estimate": estimates.ravel(), "low": low.ravel(), "high": high.ravel()},
+        index=index,
+    )
+
+
+def _per_region(function, meta, **kwargs):
+    """
+    Calls the bootstrap `function` on the models of each region of meta
+    """
+    regions = meta.index.unique("Region")
+    return pd.concat(
+        [function(meta.xs(region, level="Region"), **kwargs) for region in regions],
+        keys=regions,
+        names=["Region"],
+    )
+
+
+def _sorted_quantiles(values, counts, q):
+    """
+    Quantiles `q` (linear interpolation, as in pandas and NumPy) along axis 1
+    of `values` (resamples x rows x columns), sorted with the `counts` valid
+    values of each column first. Returns a resamples x quantiles x columns array.
+    """
+    position = np.clip(counts - 1, 0, None) * q[:, None]
+    below = np.floor(position).astype(int)
+    above = np.minimum(below + 1, np.clip(counts - 1, 0, None))
+    value_below = np.take_along_axis(values, below[None], 1)
+    value_above = np.take_along_axis(values, above[None], 1)
+    quantiles = value_below + (position - below) * (value_above - value_below)
+    quantiles[..., counts == 0] = np.nan
+    return quantiles
+
+
+def _ellipse_parameters(x, y, mask):
+    """
+    Mean, standard deviation and correlation of the masked values along the
+    last axis. Returns an array with the five parameters along the second axis.
+    """
+    n = mask.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu_x, mu_y = (x * mask).sum(axis=-1) / n, (y * mask).sum(axis=-1) / n
+        dx, dy = (x - mu_x[..., None]) * mask, (y - mu_y[..., None]) * mask
+        var_x = (dx ** 2).sum(axis=-1) / (n - 1)
+        var_y = (dy ** 2).sum(axis=-1) / (n - 1)
+        cov_xy = (dx * dy).sum(axis=-1) / (n - 1)
+        sigma_x, sigma_y = np.sqrt(var_x), np.sqrt(var_y)
+        rho = cov_xy / (sigma_x * sigma_y)
+    return np.stack([mu_x, mu_y, sigma_x, sigma_y, rho], axis=1)
+
+
+def _interval(resampled, confidence):
+    """
+    Lower and upper bound of the `confidence` interval over the resamples (axis 0)
+    """
+    alpha = (1 - confidence) / 2
+    with np.errstate(invalid="ignore"):
+        return np.percentile(resampled, [100 * alpha, 100 * (1 - alpha)], axis=0)
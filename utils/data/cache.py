@@ -0,0 +1,68 @@
+"""
+On-disk cache of pre-processed snapshots
+
+The pre-processed data is stored as Parquet (requires pyarrow or fastparquet),
+keyed by the path of the snapshot, the hash of its contents and the
+pre-processing options. A changed snapshot or different options result in a
+different key. Cache files of older versions of a snapshot (same path) are
+removed when a new one is written.
+"""
+
+import os
+import json
+import hashlib
+import pandas as pd
+
+# Increase when the pre-processing itself changes, to invalidate existing caches
+CACHE_VERSION = 2
+
+
+def cache_path(data_filename: str, cache_dir: str, options: dict):
+    """
+    Cache files are named <snapshot>.<path hash>.<file hash>-<options hash>.parquet
+    """
+    path_hash = hashlib.sha256(os.path.abspath(data_filename).encode())
+    file_hash = hashlib.sha256()
+    with open(data_filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(block)
+    options_hash = hashlib.sha256(
+        json.dumps({"version": CACHE_VERSION, **options}, sort_keys=True).encode()
+    )
+    stem = os.path.splitext(os.path.basename(data_filename))[0]
+    key = f"{file_hash.hexdigest()[:16]}-{options_hash.hexdigest()[:8]}"
+    return os.path.join(cache_dir, f"{stem}.{path_hash.hexdigest()[:8]}.{key}.parquet")
+
+
+def read_cache(path: str):
+    """
+    Returns the cached dataframe, or None if there is no (readable) cache file
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Could not read cache file {path}: {e}")
+        return None
+
+
+def write_cache(data: pd.DataFrame, path: str):
+    cache_dir, filename = os.path.split(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        data.to_parquet(path)
+    except Exception as e:
+        print(f"Could not cache pre-processed data: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    # Remove cache files of outdated versions of the same snapshot file
+    stem, path_hash, key, _ = filename.rsplit(".", 3)
+    file_hash = key.split("-")[0]
+    for other in os.listdir(cache_dir):
+        parts = other.rsplit(".", 3)
+        if len(parts) == 4 and parts[:2] == [stem, path_hash] and parts[3] == "parquet":
+            if parts[2].split("-")[0] != file_hash:
+                os.remove(os.path.join(cache_dir, other))
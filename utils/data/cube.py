@@ -0,0 +1,168 @@
+"""
+Dense array representation of the data
+
+The long-format dataframe returned by `import_data` is converted to a
+model x scenario x variable x year float array, with the labels of each
+dimension stored separately. Selections are array indexing operations,
+and computations can be done on all models and years at once.
+
+With `by_region=True`, the model dimension contains (model, region) pairs,
+such that all regions are computed at once as well.
+"""
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ["model", "scenario", "variable", "year"]
+
+
+class DataCube:
+    """
+    Values of `data` as a dense model x scenario x variable x year array.
+    Missing values are NaN.
+
+    A DataCube can be passed instead of `data` to `get` and
+    `set_value_from_var_column`.
+    """
+
+    def __init__(self, values, models, scenarios, variables, years):
+        self.values = values
+        self.models = models
+        self.scenarios = scenarios
+        self.variables = variables
+        self.years = years
+
+    @classmethod
+    def from_data(
+        cls,
+        data: pd.DataFrame,
+        scenarios=None,
+        variables=None,
+        dtype=float,
+        by_region=False,
+    ):
+        """
+        Creates the cube from the output of `import_data`.
+
+        scenarios [None]: only use these scenarios (default: all)
+        variables [None]: only use these variables (default: all)
+        dtype [float]:    use np.float32 to halve the memory usage
+        by_region [False]: the models are labelled by (Model, Region) pairs
+        """
+        if scenarios is not None:
+            data = data[data["Scenario"].isin(scenarios)]
+        if variables is not None:
+            data = data[data["Variable"].isin(variables)]
+
+        def labels(column, selected, name):
+            if selected is None:
+                selected = data[column].unique()
+            return pd.Index(np.asarray(list(selected), dtype=object), name=name)
+
+        if by_region:
+            models = pd.MultiIndex.from_arrays(
+                [data["Model"].to_numpy(object), data["Region"].to_numpy(object)],
+                names=["Model", "Region"],
+            )
+            model_labels = models.unique()
+        else:
+            models = data["Model"]
+            model_labels = labels("Model", None, "Model")
+        scenarios = labels("Scenario", scenarios, "Scenario")
+        variables = labels("Variable", variables, "Variable")
+        years = pd.Index([col for col in data.columns if str(col).isdigit()])
+
+        positions = [
+            model_labels.get_indexer(models),
+            scenarios.get_indexer(data["Scenario"]),
+            variables.get_indexer(data["Variable"]),
+        ]
+
+        # If there are multiple rows for a model/scenario/variable, the first one is used
+        flat = np.ravel_multi_index(
+            positions, (len(model_labels), len(scenarios), len(variables))
+        )
+        _, first = np.unique(flat, return_index=True)
+
+        values = np.full(
+            (len(model_labels), len(scenarios), len(variables), len(years)),
+            np.nan,
+            dtype=dtype,
+        )
+        values[tuple(pos[first] for pos in positions)] = data[years].to_numpy(dtype)[
+            first
+        ]
+        return cls(values, model_labels, scenarios, variables, years)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def _indexer(self, dimension, labels):
+        """
+        Positions of `labels` along `dimension`. A single label returns an
+        integer (removing the dimension), None selects everything.
+        """
+        index = getattr(self, dimension + "s")
+        if labels is None:
+            return slice(None)
+        if isinstance(labels, (list, tuple, np.ndarray, pd.Index)):
+            positions = index.get_indexer(labels)
+            if (positions == -1).any():
+                missing = list(np.asarray(labels)[positions == -1])
+                raise KeyError(f"{missing} not in {dimension}s of cube")
+            return positions
+        return index.get_loc(labels)
+
+    def sel(self, model=None, scenario=None, variable=None, year=None):
+        """
+        Returns the values for the selected labels as an array. Each argument
+        can be a single label (the dimension is dropped), a list of labels or
+        None (all labels). For example, `cube.sel(scenario="diag-base",
+        variable="Final Energy")` gives a model x year array.
+        """
+        result = self.values
+        # Select dimension by dimension, from last to first, such that integer
+        # indexing of one dimension does not shift the axes of the others
+        for axis, (dimension, labels) in reversed(
+            list(enumerate(zip(DIMENSIONS, [model, scenario, variable, year])))
+        ):
+            indexer = self._indexer(dimension, labels)
+            result = result[(slice(None),) * axis + (indexer,)]
+        return result
+
+    def get(self, scenario, variable, year=None):
+        """
+        Same as `get(data, scenario, variable, year)`, but returns a value
+        for every model in the cube (NaN if the model has no data)
+        """
+        if year is None:
+            year = list(self.years[self.years.get_loc("2010") :])
+        single_year = isinstance(year, str)
+        if scenario in self.scenarios and variable in self.variables:
+            values = self.sel(scenario=scenario, variable=variable, year=year)
+        else:
+            shape = (
+                (len(self.models),) if single_year else (len(self.models), len(year))
+            )
+            values = np.full(shape, np.nan)
+        if single_year:
+            return pd.Series(values, index=self.models, name=year)
+        return pd.DataFrame(values, index=self.models, columns=year)
+
+    def get_per_model(self, models, scenario, variables, year):
+        """
+        For each model in `models`, the value of the corresponding variable
+        in `variables` (used by `get_from_var_column`). `year` can be a single
+        year or a list of years.
+        """
+        model_pos = self.models.get_indexer(models)
+        variable_pos = self.variables.get_indexer(variables)
+        if scenario in self.scenarios:
+            values = self.sel(scenario=scenario, year=year)[model_pos, variable_pos]
+            values[(model_pos == -1) | (variable_pos == -1)] = np.nan
+        else:
+            values = np.full((len(models),) + np.shape(year), np.nan)
+        if isinstance(year, str):
+            return pd.Series(values, index=models, name=year)
+        return pd.DataFrame(values, index=models, columns=year)
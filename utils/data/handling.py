@@ -2,34 +2,241 @@
 Contains functions for basic data manipulation
 """
 
+import inspect
+import functools
+
 import numpy as np
+import pandas as pd
+
+from .cube import DataCube
 
 
-def get(data, scenario, variable, year=None):
-    selection = data[
-        (data["Scenario"] == scenario) & (data["Variable"] == variable)
-    ].set_index("Model")
+def get(data, scenario, variable, year=None, region=None):
+    """
+    Values of `variable` in `scenario`, indexed by Model (or by Model and
+    Region, for a DataIndex or DataCube built per region). If `region` is
+    given, only the values of that region are returned, indexed by Model.
+
+    data: DataFrame, or a DataIndex or DataCube for faster repeated lookups
+    """
+    if isinstance(data, DataCube):
+        values = data.get(scenario, variable, year)
+        return values if region is None else _in_region(values, region)
+    if isinstance(data, DataIndex):
+        selection = data.lookup(scenario, variable)
+    else:
+        selection = data[
+            (data["Scenario"] == scenario) & (data["Variable"] == variable)
+        ].set_index("Model")
+    if region is not None:
+        selection = _in_region(selection, region)
     if year is None:
         return selection.loc[:, "2010":]
     else:
         return selection[year]
 
 
+def _in_region(selection, region):
+    """
+    Rows of `selection` (indexed by Model, or by Model and Region) in `region`
+    """
+    if "Region" in selection.index.names:
+        in_region = selection.index.get_level_values("Region") == region
+        return selection[in_region].droplevel("Region")
+    if isinstance(selection, pd.DataFrame) and "Region" in selection.columns:
+        return selection[selection["Region"] == region]
+    raise ValueError("The data has no Region dimension")
+
+
 def set_value_from_var_column(data, meta, metacol, col, year, scenario):
     """
     Adds a column to the meta df using the `data` df. Which variable to use
     is taken from a `metacol` column in the meta df. For example, the GDP
     metric is sometimes GDP|PPP and sometimes GDP|MER, depending on the model.
-    
+
     In this example, metacol would be 'GDP_metric'.
     """
-    meta[col] = np.nan
-    for model, info in meta.iterrows():
-        var = info[metacol]
-        selection = data[
-            (data["Variable"] == var)
-            & (data["Model"] == model)
-            & (data["Scenario"] == scenario)
+    meta[col] = get_from_var_column(data, meta, metacol, scenario, year)
+
+
+def get_from_var_column(data, meta, metacol, scenario, year):
+    """
+    Same as `set_value_from_var_column`, but returns the values instead of
+    adding them to meta: a Series (indexed like meta) for a single year, or a
+    model x year DataFrame if `year` is a list of years.
+
+    The (model, variable) pairs from meta are joined to the data in one merge.
+    If a model has multiple rows for its variable, the first one is used.
+    If meta is indexed by Model and Region, the values of each region are used.
+    """
+    if isinstance(data, DataCube):
+        return data.get_per_model(meta.index, scenario, meta[metacol].values, year)
+
+    variables = list(meta[metacol].dropna().unique())
+    if isinstance(data, DataIndex):
+        candidates = data.lookup_many(
+            [(scenario, var) for var in variables]
+        ).reset_index()
+    else:
+        candidates = data[
+            (data["Scenario"] == scenario) & data["Variable"].isin(variables)
         ]
-        if len(selection) > 0:
-            meta.loc[model, col] = selection.iloc[0][year]
+
+    years = [year] if isinstance(year, str) else list(year)
+    keys = ["Model", "Region"] if meta.index.nlevels == 2 else ["Model"]
+    requested = pd.DataFrame(
+        {"Variable": meta[metacol].values}, index=meta.index.set_names(keys)
+    ).reset_index()
+    values = (
+        requested.merge(candidates[keys + ["Variable"] + years], on=keys + ["Variable"])
+        .drop_duplicates(keys)
+        .set_index(keys)[year]
+    )
+    return values.reindex(meta.index).astype(float)
+
+
+def add_columns(meta, columns):
+    """
+    Returns a copy of meta with `columns` (dictionary of column name -> Series,
+    or a DataFrame) added in a single concatenation, instead of inserting them
+    one by one. Columns which already exist in meta are replaced in place.
+    """
+    block = pd.DataFrame(columns, index=meta.index)
+    existing = block.columns.intersection(meta.columns)
+    if len(existing) > 0:
+        meta = meta.assign(**{col: block[col] for col in existing})
+    return pd.concat(
+        [meta, block[block.columns.difference(existing, sort=False)]], axis=1
+    )
+
+
+def indicator_columns(calculate):
+    """
+    Decorator for the `create_columns` of the indicators. `calculate(data, meta,
+    years, **kwargs)` returns the created columns (dictionary of column name ->
+    Series indexed like meta), and is given the data indexed on (scenario,
+    variable) for fast lookups and the list of years without duplicates.
+    """
+    # Indicators which print notes of their own get the `mute` argument
+    takes_mute = "mute" in inspect.signature(calculate).parameters
+
+    @functools.wraps(calculate)
+    def create_columns(
+        data, meta, years=["2050", "2100"], mute=False, new_columns_only=False, **kwargs
+    ):
+        years = list(dict.fromkeys(years))
+        data = build_index(data, by_region="Region" in meta.index.names)
+        if takes_mute:
+            kwargs["mute"] = mute
+        columns = calculate(data, meta, years, **kwargs)
+
+        if not mute:
+            print(f"Created columns: {list(columns)}\n")
+
+        if new_columns_only:
+            return pd.DataFrame(columns, index=meta.index)
+        return add_columns(meta, columns)
+
+    create_columns.__doc__ = (
+        (calculate.__doc__ or "").rstrip() + "\n" + _CREATE_COLUMNS_DOC
+    )
+    return create_columns
+
+
+_CREATE_COLUMNS_DOC = """
+    All years are computed at once, so `years` can be any list of years
+    (e.g. every 5 years from 2020 to 2100)
+
+    new_columns_only [False]: only return the created columns (indexed like
+            meta) instead of meta with the columns added
+    """
+
+
+def select(data, keys):
+    """
+    Returns the rows of `data` with one of the (scenario, variable) pairs in `keys`
+    """
+    keys = list(keys)
+    if isinstance(data, DataIndex):
+        return data.rows(keys)
+    scenarios, variables = zip(*keys) if keys else ([], [])
+    rows = data[data["Scenario"].isin(scenarios) & data["Variable"].isin(variables)]
+    pairs = pd.MultiIndex.from_arrays([rows["Scenario"], rows["Variable"]])
+    return rows[pairs.isin(keys)]
+
+
+##################
+## Indexed lookups
+##################
+
+
+class DataIndex:
+    """
+    Lookup table from (scenario, variable) to the rows of `data` with
+    that scenario and variable, indexed by Model (or by Model and Region
+    if `by_region`).
+
+    Only the row positions are stored, sorted by scenario and variable, such
+    that each lookup is a dictionary access followed by a positional slice
+    instead of a boolean mask over the full dataframe. The values are always
+    read from `data` itself, so changes to the values are seen directly. After
+    changing the Scenario, Variable, Model or Region columns, or adding or
+    removing rows, a new index has to be built.
+    """
+
+    def __init__(self, data: pd.DataFrame, by_region=False):
+        codes = (
+            data.groupby(["Scenario", "Variable"], sort=False, observed=True)
+            .ngroup()
+            .to_numpy()
+        )
+        self.order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[self.order]
+
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        stops = np.r_[starts[1:], len(sorted_codes)]
+        first_rows = self.order[starts]
+        keys = zip(
+            data["Scenario"].to_numpy()[first_rows],
+            data["Variable"].to_numpy()[first_rows],
+        )
+        self.slices = {
+            key: (start, stop) for key, start, stop in zip(keys, starts, stops)
+        }
+        self.data = data
+        self.shape = data.shape
+        self.index_columns = ["Model", "Region"] if by_region else "Model"
+
+    def rows(self, keys):
+        """
+        Rows of `data` with one of the (scenario, variable) pairs in `keys`
+        """
+        if self.data.shape != self.shape:
+            raise ValueError(
+                "The data changed shape since the index was built, "
+                "call build_index again"
+            )
+        positions = [self.order[slice(*self.slices.get(key, (0, 0)))] for key in keys]
+        return self.data.iloc[np.concatenate([np.arange(0)] + positions)]
+
+    def lookup(self, scenario, variable):
+        return self.rows([(scenario, variable)]).set_index(self.index_columns)
+
+    def lookup_many(self, keys):
+        """
+        keys: list of (scenario, variable) pairs
+        """
+        return self.rows(keys).set_index(self.index_columns)
+
+
+def build_index(data, by_region=False):
+    """
+    Creates an index on (scenario, variable) of the dataframe `data`, which
+    can be passed to `get`, `get_from_var_column` and `select` instead of
+    `data`. DataIndex and DataCube objects are returned as they are.
+
+    by_region [False]: values returned by `get` are indexed by Model and Region
+    """
+    if isinstance(data, (DataIndex, DataCube)):
+        return data
+    return DataIndex(data, by_region)
@@ -8,9 +8,16 @@ each indicators value.
 
 import pandas as pd
 from ..constants import COLORS_PBL
+from ..instrumentation import instrumented
 
 
-def create_meta_df(data: pd.DataFrame, model_versions_filename: str):
+@instrumented()
+def create_meta_df(data: pd.DataFrame, model_versions_filename: str, by_region=False):
+    """
+    by_region [False]: one row per model and region in `data` (index Model,
+            Region), to calculate the indicators for each region. For the
+            figures, select a single region: `meta.xs(region, level="Region")`
+    """
     # Model versions and types
     versions = pd.read_excel(model_versions_filename)
 
@@ -34,6 +41,12 @@ def create_meta_df(data: pd.DataFrame, model_versions_filename: str):
     # Only keep those models which are present in the data
     meta = meta[meta.index.isin(data["Model"])]
 
+    if by_region:
+        regions = data[["Model", "Region"]].astype(str).drop_duplicates()
+        meta = (
+            meta.reset_index().merge(regions, on="Model").set_index(["Model", "Region"])
+        )
+
     return meta
 
 
@@ -5,65 +5,231 @@ General functions to import data and perform basic pre-processing
 from typing import Optional
 import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
+from .cache import cache_path, read_cache, write_cache
+from ..instrumentation import instrumented
 
-def import_data(data_filename: str, manual_model_renames: Optional[dict] = None):
+
+ID_COLUMNS = ["Model", "Scenario", "Region", "Variable", "Unit"]
+
+
+@instrumented()
+def import_data(
+    data_filename: str,
+    manual_model_renames: Optional[dict] = None,
+    chunksize: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+    duplicates: str = "first",
+    regions=None,
+):
+    """
+    Reads and pre-processes a snapshot (semicolon separated IAMC format).
+
+    chunksize [None]: for very large snapshots, read the file in chunks of this
+            many rows. Each chunk is filtered and processed before the next one
+            is read, and Model/Scenario/Name/Region/Variable/Unit are stored as
+            categorical columns to reduce memory usage.
+    cache_dir [None]: if given, the pre-processed data is stored in this folder
+            (as Parquet) and reused on the next call, as long as the snapshot
+            file and the options are unchanged.
+    duplicates ["first"]: how to resolve duplicated Name/Variable pairs, see
+            `resolve_duplicates`.
+    regions [None]: by default, all regions are read and treated as one (with
+            a warning if there are several). To compute the indicators per
+            region, pass a list of regions (or "all"): surrounding whitespace
+            is removed from the region names, duplicates are resolved per
+            region (use `build_index(data, by_region=True)` to get values indexed
+            by Model and Region).
+    """
+    if cache_dir is None:
+        data = _import_data(
+            data_filename, manual_model_renames, chunksize, duplicates, regions
+        )
+    else:
+        path = cache_path(
+            data_filename,
+            cache_dir,
+            {
+                "manual_model_renames": manual_model_renames,
+                "onlyworld": False,
+                "categorical": chunksize is not None,
+                "duplicates": duplicates,
+                "regions": regions,
+            },
+        )
+        data = read_cache(path)
+        if data is None:
+            data = _import_data(
+                data_filename, manual_model_renames, chunksize, duplicates, regions
+            )
+            write_cache(data, path)
+
+    return data
+
+
+def _import_data(data_filename, manual_model_renames, chunksize, duplicates, regions):
     data = _prepare_data(
         data_filename,
         sep=";",
         onlyworld=False,
         manual_model_renames=manual_model_renames,
+        chunksize=chunksize,
+        regions=regions,
     )
 
     # Check for different regions
-    if len(data["Region"].unique()) > 1:
+    if regions is None and len(data["Region"].unique()) > 1:
         print("Careful, more than 1 region present:")
-        print(dict(data.groupby("Region").count().iloc[:, 0]))
-
-    # Check for problems:
-    double_check = data.groupby(["Name", "Variable"]).count()["2050"]
-    problems = double_check[double_check > 1].reset_index().groupby(["Name"]).count()
-    if len(problems) > 0:
-        print(problems["Variable"].rename("# duplicated variables").to_frame())
+        print(dict(data.groupby("Region", observed=True).count().iloc[:, 0]))
 
     # Transform Kt to Mt CO2/yr
     data.loc[data["Unit"] == "Kt", "2010":] /= 1000
-    data.loc[data["Unit"] == "Kt", "Unit"] = "Mt CO2/yr"
+    data["Unit"] = data["Unit"].replace({"Kt": "Mt CO2/yr"})
 
     # Remove duplicate pairs of name-variable
-    data = pd.concat(
-        [
-            data[~data["Name"].isin(problems.index)],
-            data[data["Name"].isin(problems.index)]
-            .groupby(["Name", "Variable"])
-            .first()
-            .reset_index(),
-        ],
-        sort=False,
-    )
+    data, report = resolve_duplicates(data, duplicates, by_region=regions is not None)
+    if len(report) > 0:
+        print(report.per_name())
 
     # Add missing 5 year timesteps
-    _interpolate_missing_5years(data)
+    data = interpolate_years(data, range(2010, 2101, 5))
 
     return data
 
 
+class DuplicateReport:
+    """
+    Lists the duplicated Name/Variable pairs found by `resolve_duplicates`,
+    with the number of rows of each pair (column "Rows").
+    """
+
+    def __init__(self, duplicates: pd.DataFrame):
+        self.duplicates = duplicates
+
+    def __len__(self):
+        return len(self.duplicates)
+
+    def __repr__(self):
+        return repr(self.duplicates)
+
+    def per_name(self):
+        return (
+            self.duplicates.groupby("Name", observed=True)
+            .size()
+            .rename("# duplicated variables")
+            .to_frame()
+        )
+
+
+@instrumented()
+def resolve_duplicates(data: pd.DataFrame, policy: str = "first", by_region=False):
+    """
+    Removes duplicated Name/Variable pairs, such that each pair has one row.
+    Returns the resolved data and a DuplicateReport.
+
+    by_region [False]: resolve Name/Region/Variable triples instead, such that
+            each region keeps its own row.
+
+    policy ["first"]: "first" or "last" take, for each year, the first (last)
+            value that is not missing. "mean" takes the mean value for each year.
+            "error" raises a ValueError if there are duplicates.
+
+    Only the rows of duplicated pairs are grouped: their values are written to
+    the first row of each pair and the other rows are dropped.
+    """
+    if policy not in ["first", "last", "mean", "error"]:
+        raise ValueError(f"Unknown policy for duplicates: {policy}")
+
+    key = ["Name", "Region", "Variable"] if by_region else ["Name", "Variable"]
+    duplicated = data.duplicated(key, keep=False).to_numpy()
+    selection = data[duplicated]
+    report = DuplicateReport(
+        selection.groupby(key, observed=True, sort=False)
+        .size()
+        .rename("Rows")
+        .reset_index()
+    )
+    if len(report) == 0:
+        return data, report
+    if policy == "error":
+        raise ValueError(f"Duplicated Name/Variable pairs:\n{report}")
+
+    year_columns = [col for col in data.columns if str(col).isdigit()]
+    resolved = selection.groupby(key, observed=True, sort=False)[year_columns].agg(
+        policy
+    )
+
+    # Groups are in order of first occurrence, just as the first rows of each pair
+    first_rows = duplicated & ~data.duplicated(key, keep="first").to_numpy()
+    data = data[~duplicated | first_rows].copy()
+    data.loc[first_rows[~duplicated | first_rows], year_columns] = resolved.to_numpy()
+    return data, report
+
+
+@instrumented()
 def _prepare_data(
-    database, startyear=2010, dt=10, onlyworld=True, manual_model_renames=None, **kwargs
+    database,
+    startyear=2010,
+    dt=10,
+    onlyworld=True,
+    manual_model_renames=None,
+    chunksize=None,
+    regions=None,
+    **kwargs,
 ):
-    data_raw = pd.read_csv(database, **kwargs)
-
+    """
+    regions [None]: list of regions to keep (or "all"), see `import_data`
+    """
     # Choose only decadal data
-    data = data_raw.loc[
-        :,
-        ["Model", "Scenario", "Region", "Variable", "Unit"]
-        + [str(y) for y in np.arange(startyear, 2101, dt)],
-    ]
+    columns = ID_COLUMNS + [str(y) for y in np.arange(startyear, 2101, dt)]
+
+    if chunksize is None:
+        data = _prepare_chunk(
+            pd.read_csv(database, usecols=columns, **kwargs),
+            columns,
+            onlyworld,
+            manual_model_renames,
+            regions,
+        )
+    else:
+        # Stream the file: only the selected rows of each chunk are kept,
+        # with categorical identifier columns
+        data = _concat_categorical(
+            [
+                _prepare_chunk(
+                    chunk, columns, onlyworld, manual_model_renames, regions
+                ).astype({col: "category" for col in ID_COLUMNS})
+                for chunk in pd.read_csv(
+                    database, usecols=columns, chunksize=chunksize, **kwargs
+                )
+            ],
+            ID_COLUMNS,
+        )
+
+    # Add column Name, equal to Model + Scenario
+    if chunksize is None:
+        data.insert(2, "Name", data["Model"] + " " + data["Scenario"])
+    else:
+        name = data["Model"].astype(str) + " " + data["Scenario"].astype(str)
+        data.insert(2, "Name", name.astype("category"))
+
+    return data
+
+
+def _prepare_chunk(data_raw, columns, onlyworld, manual_model_renames, regions=None):
+    data = data_raw.loc[:, columns]
 
     # Choose only region == World
     if onlyworld:
         data = data[data["Region"] == "World"]
 
+    # Choose the selected regions (with whitespace around the names removed)
+    if regions is not None:
+        data["Region"] = data["Region"].str.strip()
+        if regions != "all":
+            data = data[data["Region"].isin(regions)]
+
     # Set all scenario names to lowercase
     data["Scenario"] = data["Scenario"].str.lower()
 
@@ -71,18 +237,57 @@ def _prepare_data(
     if manual_model_renames is not None:
         data["Model"] = data["Model"].replace(manual_model_renames)
 
-    # Add column Name, equal to Model + Scenario
-    data.insert(2, "Name", data["Model"] + " " + data["Scenario"])
-
     return data
 
 
-def _interpolate_missing_5years(data: pd.DataFrame):
-    col_2010 = list(data.columns).index("2010")
-    for i, year in enumerate(range(2015, 2105, 10)):
-        data.insert(
-            col_2010 + 2 * i + 1,
-            str(year),
-            data[[str(year - 5), str(year + 5)]].mean(axis=1),
-        )
+def _concat_categorical(chunks, columns):
+    """
+    Concatenates the chunks while keeping `columns` categorical (pd.concat
+    only does this when all categories are identical)
+    """
+    for col in columns:
+        categories = union_categoricals([chunk[col] for chunk in chunks]).categories
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks)
+
+
+@instrumented()
+def interpolate_years(data: pd.DataFrame, years) -> pd.DataFrame:
+    """
+    Returns a copy of `data` where the year columns are replaced by `years`
+    (e.g. range(2010, 2101, 5), or an annual grid), linearly interpolated
+    between the neighbouring available years. If one of the two neighbouring
+    values is missing, the other one is used. Years outside the range of the
+    available years are NaN.
+
+    All values are computed in one NumPy array, resulting in a single float block.
+    """
+    year_columns = [col for col in data.columns if str(col).isdigit()]
+    known = np.array([int(col) for col in year_columns])
+    values = data[year_columns].to_numpy(dtype=float)
 
+    years = np.asarray(years, dtype=int)
+    right = np.clip(np.searchsorted(known, years), 1, len(known) - 1)
+    left = right - 1
+    weight = (years - known[left]) / (known[right] - known[left])
+
+    left_values = values[:, left]
+    right_values = values[:, right]
+    # Use the other neighbour if one of them is missing
+    left_values = np.where(np.isnan(left_values), right_values, left_values)
+    right_values = np.where(np.isnan(right_values), left_values, right_values)
+    interpolated = (1 - weight) * left_values + weight * right_values
+
+    # Exactly known years are copied, years outside of the known range are NaN
+    exact = np.isin(years, known)
+    interpolated[:, exact] = values[:, np.searchsorted(known, years[exact])]
+    interpolated[:, (years < known.min()) | (years > known.max())] = np.nan
+
+    return pd.concat(
+        [
+            data.drop(columns=year_columns),
+            pd.DataFrame(interpolated, index=data.index, columns=years.astype(str)),
+        ],
+        axis=1,
+    )
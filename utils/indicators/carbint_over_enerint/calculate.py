@@ -1,19 +1,35 @@
 import numpy as np
-from utils.data.handling import get, set_value_from_var_column
+from utils.data.handling import get, get_from_var_column, indicator_columns
+from utils.instrumentation import instrumented
+
+SCENARIOS = ["diag-c80-gr5", "diag-base"]
+
+
+def requirements(meta, **kwargs):
+    """
+    (scenario, variable) pairs used by `create_columns`
+    """
+    variables = [
+        "Emissions|CO2|Energy and Industrial Processes",
+        "Final Energy",
+    ] + list(meta["GDP_metric"].dropna().unique())
+    return {(scenario, var) for scenario in SCENARIOS for var in variables}
 
 
 def calc_carbon_and_energy_intensity(data, meta, year, scenario):
+    """
+    Carbon and energy intensity for a single year (Series) or for a list
+    of years (model x year DataFrames)
+    """
 
     # For each model, get either GDP|PPP or GDP|MER (depending on column `GDP_metric`)
-    GDP_column = f"GDP {year} {scenario}"
-    set_value_from_var_column(data, meta, "GDP_metric", GDP_column, year, scenario)
+    GDP = get_from_var_column(data, meta, "GDP_metric", scenario, year)
 
     CO2_FFI = get(data, scenario, "Emissions|CO2|Energy and Industrial Processes", year)
     final_energy = get(data, scenario, "Final Energy", year)
-    GDP_PPP = meta[GDP_column]
 
     carbon_intensity = CO2_FFI / final_energy
-    energy_intensity = final_energy / GDP_PPP
+    energy_intensity = final_energy / GDP
 
     return carbon_intensity, energy_intensity
 
@@ -26,30 +42,27 @@ def calc_normalised_carbon_and_energy_intensity(data, meta, year):
     return CI_pol / CI_baseline, EI_pol / EI_baseline
 
 
-def create_columns(data, meta, years=["2050", "2100"], mute=False):
+@instrumented()
+@indicator_columns
+def create_columns(data, meta, years):
+    """
+    Reduction of the carbon and energy intensity, and CoEI
+    """
 
-    new_meta = meta.copy()
+    columns = {}
 
-    created_columns = []
+    (CI_over_baseline, EI_over_baseline,) = calc_normalised_carbon_and_energy_intensity(
+        data, meta, years
+    )
+    CI_reduction, EI_reduction = 1 - CI_over_baseline, 1 - EI_over_baseline
+    CI_over_EI = CI_reduction / (CI_reduction + 1 - EI_over_baseline)
 
     for year in years:
         col_CI = f"Carbon intensity {year}"
         col_EI = f"Energy intensity {year}"
         col_CI_over_EI = f"CoEI {year}"
 
-        (
-            CI_over_baseline,
-            EI_over_baseline,
-        ) = calc_normalised_carbon_and_energy_intensity(data, meta, year)
-
-        new_meta[col_CI], new_meta[col_EI] = 1 - CI_over_baseline, 1 - EI_over_baseline
-        new_meta[col_CI_over_EI] = (1 - CI_over_baseline) / (
-            1 - CI_over_baseline + 1 - EI_over_baseline
-        )
-        created_columns += [col_CI, col_EI, col_CI_over_EI]
-
-    if not mute:
-        print(f"Created columns: {created_columns}\n")
-
-    return new_meta
+        columns[col_CI], columns[col_EI] = CI_reduction[year], EI_reduction[year]
+        columns[col_CI_over_EI] = CI_over_EI[year]
 
+    return columns
@@ -1,9 +1,21 @@
 import numpy as np
 from plotly.subplots import make_subplots
-from utils.plot.general import confidence_ellipse, add_model_comparison, GRIDCOLOR
+from utils.plot.general import (
+    confidence_ellipses,
+    add_model_comparison,
+    add_connected_dots,
+    use_webgl,
+    GRIDCOLOR,
+    ELLIPSE_POINTS,
+    WEBGL_ELLIPSE_POINTS,
+)
+from utils.instrumentation import instrumented
 
 
-def create_fig(meta, models, year: str, xrange=None, **kwargs):
+@instrumented()
+def create_fig(meta, models, year: str, xrange=None, webgl=None, **kwargs):
+    webgl = use_webgl(webgl, len(meta))
+    ellipse_points = WEBGL_ELLIPSE_POINTS if webgl else ELLIPSE_POINTS
 
     fig_CoEI = make_subplots(
         1,
@@ -26,14 +38,16 @@ def create_fig(meta, models, year: str, xrange=None, **kwargs):
     ##############
 
     # Add background shape for 2050 and 2100
+    ellipses = confidence_ellipses(
+        meta,
+        [(col_CI_2050, col_EI_2050), (col_CI_2100, col_EI_2100)],
+        npoints=ellipse_points,
+    )
     for col_CI, col_EI, col_year in [
         (col_CI_2050, col_EI_2050, 2050),
         (col_CI_2100, col_EI_2100, 2100),
     ]:
-        selection = meta[~meta[[col_CI, col_EI]].isna().any(axis=1)]
-        x_ellipse, y_ellipse = confidence_ellipse(
-            selection[col_CI], selection[col_EI], 2
-        )
+        x_ellipse, y_ellipse = ellipses[col_CI, col_EI, 2]
         fig_CoEI.add_scatter(
             x=x_ellipse,
             y=y_ellipse,
@@ -52,28 +66,19 @@ def create_fig(meta, models, year: str, xrange=None, **kwargs):
 
     # Create connected dots for 2050 and 2100 values
     for is_newest, selection in meta.groupby("Newest"):
-        for model, info in selection.iterrows():
-            stripped_model = info["Stripped model"]
-
-            if stripped_model not in models.index:
-                # Ignore entries that are not in `models`
-                continue
-
-            color = models.loc[stripped_model, "Color"] if is_newest else "#BBB"
-
-            fig_CoEI.add_scatter(
-                x=info[[col_CI_2050, col_CI_2100]],
-                y=info[[col_EI_2050, col_EI_2100]],
-                marker={
-                    "color": [color, "#FFF"],
-                    "size": 8,
-                    "line": {"color": color, "width": 2},
-                },
-                line={"color": color, "width": 1, "dash": "solid"},
-                mode="markers+lines",
-                name=stripped_model,
-                showlegend=False,
-            )
+        # Ignore entries that are not in `models`
+        selection = selection[selection["Stripped model"].isin(models.index)]
+        colors = (
+            selection["Stripped model"].map(models["Color"]) if is_newest else "#BBB"
+        )
+        add_connected_dots(
+            fig_CoEI,
+            selection[[col_CI_2050, col_CI_2100]],
+            selection[[col_EI_2050, col_EI_2100]],
+            np.broadcast_to(colors, len(selection)),
+            selection["Stripped model"],
+            webgl=webgl,
+        )
 
     ##############
     # 2b: CoEI
@@ -88,6 +93,7 @@ def create_fig(meta, models, year: str, xrange=None, **kwargs):
         narrative_left="More via demand red.",
         narrative_right="More via decarbon.",
         labelshift=1.2,
+        webgl=webgl,
         **kwargs,
     )
 
@@ -1,69 +1,110 @@
-import numpy as np
+from utils.data.handling import get, get_from_var_column, indicator_columns
+from utils.instrumentation import instrumented
 
-from utils.data.handling import set_value_from_var_column
+# Hardcoded carbon prices of the policy scenario
+CARBON_PRICES = {"2050": 130.3, "2100": 1441.3}
 
 
+def requirements(meta, policy_scenario="diag-c80-gr5", **kwargs):
+    """
+    (scenario, variable) pairs used by `create_columns`
+    """
+
+    def variables(metacol):
+        return set(meta[metacol].dropna().unique())
+
+    return (
+        {(policy_scenario, "Price|Carbon")}
+        | {(policy_scenario, var) for var in variables("Policy cost variable")}
+        | {(policy_scenario, var) for var in variables("GDP_metric")}
+        | {
+            (scenario, var)
+            for scenario in [policy_scenario, "diag-base"]
+            for var in variables("Emissions_for_CAV")
+        }
+    )
+
+
+@instrumented()
+@indicator_columns
 def create_columns(
     data,
-    prev_meta,
-    years=["2050", "2100"],
-    cprices=[130.3, 1441.3],
+    meta,
+    years,
+    cprices=CARBON_PRICES,
     policy_scenario="diag-c80-gr5",
     mute=False,
 ):
+    """
+    Policy costs (also per GDP), emission reductions and CAV
 
-    meta = prev_meta.copy()
-    created_columns = []
+    cprices: carbon price used for each year, as a dictionary {year: price}
+            or as a list in the same order as `years`. For years without
+            a given price, the carbon price reported by each model in the
+            policy scenario is used (printed unless `mute`).
+    """
 
-    ## Calculate policy cost for each model
-    for year, cprice in zip(years, cprices):
-        col_costs = f"Policy cost {year}"
-        col_emiss = f"Emissions CAV {year}"
-        col_emiss_base = f"{col_emiss} base"
-        set_value_from_var_column(
-            data, meta, "Policy cost variable", col_costs, year, policy_scenario
-        )
-        set_value_from_var_column(
-            data, meta, "Emissions_for_CAV", col_emiss, year, policy_scenario
-        )
-        set_value_from_var_column(
-            data, meta, "Emissions_for_CAV", col_emiss_base, year, "diag-base"
-        )
+    columns = {}
 
-        # Make all costs positive
-        meta[col_costs] = meta[col_costs].abs()
+    if not isinstance(cprices, dict):
+        cprices = dict(zip(years, cprices))
 
-        # Cost per GDP
-        col_per_GDP = f"{col_costs} per GDP"
+    ## Calculate policy cost for each model (model x year)
+    costs = get_from_var_column(
+        data, meta, "Policy cost variable", policy_scenario, years
+    )
+    emiss = get_from_var_column(data, meta, "Emissions_for_CAV", policy_scenario, years)
+    emiss_base = get_from_var_column(
+        data, meta, "Emissions_for_CAV", "diag-base", years
+    )
 
+    # Make all costs positive
+    costs = costs.abs()
+
+    # Cost per GDP
+    GDP = get_from_var_column(data, meta, "GDP_metric", policy_scenario, years)
+    new_GDP_columns = []
+    for year in years:
         GDP_column = f"GDP {year} {policy_scenario}"
         # Check if GDP column already exists
-        if GDP_column not in meta.columns:
-            set_value_from_var_column(
-                data, meta, "GDP_metric", GDP_column, year, policy_scenario
-            )
+        if GDP_column in meta.columns:
+            GDP[year] = meta[GDP_column]
+        else:
+            new_GDP_columns.append(year)
+
+    per_GDP = costs / GDP
 
-        meta[col_per_GDP] = meta[col_costs] / meta[GDP_column]
+    # Using this information, calculate CAV
+    GHG_reduction_absolute = (emiss_base - emiss) / 1000  # Convert Mt to Gt
+    cprice = get(data, policy_scenario, "Price|Carbon", years).reindex(meta.index)
+    for year, price in cprices.items():
+        if year in years:
+            cprice[year] = price  ## Use hardcoded c-price
+    reported_years = [year for year in years if year not in cprices]
+    if reported_years and not mute:
+        print(
+            f"CAV {', '.join(reported_years)}: no carbon price given, using the "
+            f"carbon price reported by each model in {policy_scenario}"
+        )
+    CAV = costs / (GHG_reduction_absolute * cprice)
 
-        # Using this information, calculate CAV
+    # CAV < 0 or CAV > 2.5 is a mistake, exclude those
+    invalid = ~((CAV >= 0) & (CAV <= 2.5)) | (per_GDP > 0.15) | (costs > 50000)
+    costs, per_GDP, CAV = costs.mask(invalid), per_GDP.mask(invalid), CAV.mask(invalid)
+
+    for year in years:
+        col_costs = f"Policy cost {year}"
+        col_emiss = f"Emissions CAV {year}"
+        col_emiss_base = f"{col_emiss} base"
+        col_per_GDP = f"{col_costs} per GDP"
         col_CAV = f"CAV {year}"
-        GHG_reduction_absolute = (
-            meta[col_emiss_base] - meta[col_emiss]
-        ) / 1000  # Convert Mt to Gt
-        # cprice = meta[f'Carbon price c80 {year}'] ## Use hardcoded c-price
-        meta[col_CAV] = meta[col_costs] / (GHG_reduction_absolute * cprice)
-
-        # CAV < 0 or CAV > 2.5 is a mistake, exclude those
-        meta.loc[
-            ~meta[col_CAV].between(0, 2.5)
-            | (meta[col_per_GDP] > 0.15)
-            | (meta[col_costs] > 50000),
-            [col_costs, col_per_GDP, col_CAV, col_per_GDP],
-        ] = np.nan
-
-        created_columns += [col_costs, col_emiss, col_emiss_base, col_per_GDP, col_CAV]
-
-    if not mute:
-        print(f"Created columns: {created_columns}\n")
-
-    return meta
+
+        columns[col_costs] = costs[year]
+        columns[col_emiss] = emiss[year]
+        columns[col_emiss_base] = emiss_base[year]
+        if year in new_GDP_columns:
+            columns[f"GDP {year} {policy_scenario}"] = GDP[year]
+        columns[col_per_GDP] = per_GDP[year]
+        columns[col_CAV] = CAV[year]
+
+    return columns
@@ -1,9 +1,21 @@
 import numpy as np
 from plotly.subplots import make_subplots
-from utils.plot.general import add_model_comparison, confidence_ellipse, GRIDCOLOR
+from utils.plot.general import (
+    add_model_comparison,
+    add_connected_dots,
+    confidence_ellipses,
+    use_webgl,
+    GRIDCOLOR,
+    ELLIPSE_POINTS,
+    WEBGL_ELLIPSE_POINTS,
+)
+from utils.instrumentation import instrumented
 
 
-def create_fig(meta, models, year: str, xrange=None, **kwargs):
+@instrumented()
+def create_fig(meta, models, year: str, xrange=None, webgl=None, **kwargs):
+    webgl = use_webgl(webgl, len(meta))
+    ellipse_points = WEBGL_ELLIPSE_POINTS if webgl else ELLIPSE_POINTS
     fig_CAV = make_subplots(
         1,
         2,
@@ -23,12 +35,14 @@ def create_fig(meta, models, year: str, xrange=None, **kwargs):
     cols_y = ["RAI c80 2050 CO2 FFI", "RAI c80 2100 CO2 FFI"]
 
     # Add background shape for 2050 and 2100
+    ellipses = confidence_ellipses(
+        meta, list(zip(cols_x, cols_y)), npoints=ellipse_points
+    )
     for col_x, col_y, col_year in [
         (cols_x[0], cols_y[0], 2050),
         (cols_x[1], cols_y[1], 2100),
     ]:
-        selection = meta[~meta[[col_x, col_y]].isna().any(axis=1)]
-        x_ellipse, y_ellipse = confidence_ellipse(selection[col_x], selection[col_y], 2)
+        x_ellipse, y_ellipse = ellipses[col_x, col_y, 2]
         fig_CAV.add_scatter(
             x=x_ellipse,
             y=y_ellipse,
@@ -48,28 +62,19 @@ def create_fig(meta, models, year: str, xrange=None, **kwargs):
     for is_newest, selection in meta[~meta[cols_x + cols_y].isna().any(axis=1)].groupby(
         "Newest"
     ):
-        for model, info in selection.iterrows():
-            stripped_model = info["Stripped model"]
-
-            if stripped_model not in models.index:
-                # Ignore entries that are not in `models`
-                continue
-
-            color = models.loc[stripped_model, "Color"] if is_newest else "#BBB"
-
-            fig_CAV.add_scatter(
-                x=info[cols_x],
-                y=info[cols_y],
-                marker={
-                    "color": [color, "#FFF"],
-                    "size": 8,
-                    "line": {"color": color, "width": 2},
-                },
-                line={"color": color, "width": 1, "dash": "solid"},
-                mode="markers+lines",
-                name=stripped_model,
-                showlegend=False,
-            )
+        # Ignore entries that are not in `models`
+        selection = selection[selection["Stripped model"].isin(models.index)]
+        colors = (
+            selection["Stripped model"].map(models["Color"]) if is_newest else "#BBB"
+        )
+        add_connected_dots(
+            fig_CAV,
+            selection[cols_x],
+            selection[cols_y],
+            np.broadcast_to(colors, len(selection)),
+            selection["Stripped model"],
+            webgl=webgl,
+        )
 
     ##############
     # 5b: CAV
@@ -83,6 +88,7 @@ def create_fig(meta, models, year: str, xrange=None, **kwargs):
         f"CAV {year}",
         narrative_left="Less expensive",
         narrative_right="More expensive",
+        webgl=webgl,
         **kwargs,
     )
 
@@ -0,0 +1,62 @@
+"""
+Computes several indicators in one pass over the data
+
+Each indicator declares which (scenario, variable) pairs it reads
+(`requirements` in its calculate module). These are fetched from the data
+once, into a DataCube (model x scenario x variable x year array), on which
+all indicators are then evaluated.
+"""
+
+import pandas as pd
+
+from utils.data.cube import DataCube
+from utils.data.handling import select, add_columns
+from utils.instrumentation import instrumented
+from . import (
+    relative_abatement_index,
+    carbint_over_enerint,
+    fossil_fuel_reduction,
+    cost_abat_value,
+)
+
+# Order of the columns in the meta dataframe
+INDICATORS = {
+    "RAI": relative_abatement_index,
+    "CoEI": carbint_over_enerint,
+    "FFR": fossil_fuel_reduction,
+    "CAV": cost_abat_value,
+}
+
+
+@instrumented()
+def create_all_columns(data, meta, indicators=None, years=["2050", "2100"], mute=False):
+    """
+    Same as calling `create_columns` of each indicator in `indicators`
+    (default: all, in the order of INDICATORS) on the meta dataframe,
+    for each year in `years`.
+
+    If meta is indexed by Model and Region (`create_meta_df(..., by_region=True)`),
+    the indicators of all regions are computed at once.
+    """
+    modules = [
+        module
+        for name, module in INDICATORS.items()
+        if indicators is None or name in indicators
+    ]
+
+    keys = set()
+    for module in modules:
+        keys |= module.requirements(meta)
+    cube = DataCube.from_data(
+        select(data, keys),
+        scenarios=sorted({scenario for scenario, _ in keys}),
+        variables=sorted({variable for _, variable in keys}),
+        by_region="Region" in meta.index.names,
+    )
+
+    # The columns of all indicators are joined to meta at once
+    blocks = [
+        module.create_columns(cube, meta, years=years, mute=mute, new_columns_only=True)
+        for module in modules
+    ]
+    return add_columns(meta, pd.concat(blocks, axis=1))
@@ -1,3 +1,10 @@
-from .calculate import create_columns
-from .plot import create_fig
+from .calculate import create_columns, requirements
 
+
+def __getattr__(name):
+    # Plotting code (and Plotly) is only imported when create_fig is used
+    if name == "create_fig":
+        from .plot import create_fig
+
+        return create_fig
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,5 @@
-from utils.data.handling import get
+from utils.data.handling import get, indicator_columns
+from utils.instrumentation import instrumented
 
 VARIABLES = [
     "Fossil|w/o CCS",
@@ -18,48 +19,69 @@ LABELS = [
 ]
 
 
+def requirements(meta, **kwargs):
+    """
+    (scenario, variable) pairs used by `create_columns`
+    """
+    variables = [f"Primary Energy|{var}" for var in VARIABLES] + [
+        "Primary Energy|Fossil",
+        "Primary Energy|Biomass",
+    ]
+    return {("diag-c80-gr5", var) for var in variables} | {
+        ("diag-base", "Primary Energy|Fossil")
+    }
+
+
 def calc_fossil_fuel_reduction(
     data, year, pol, base="diag-base", var="Primary Energy|Fossil"
 ):
+    """
+    FFR for a single year (Series) or for a list of years
+    (model x year DataFrame)
+    """
 
     prim_energy_fossil_2020 = get(data, base, var, "2020")
     prim_energy_fossil_pol = get(data, pol, var, year)
 
-    return (prim_energy_fossil_2020 - prim_energy_fossil_pol) / prim_energy_fossil_2020
+    return prim_energy_fossil_pol.rsub(prim_energy_fossil_2020, axis=0).div(
+        prim_energy_fossil_2020, axis=0
+    )
 
 
-def create_columns(data, meta, years=["2050", "2100"], mute=False):
+@instrumented()
+@indicator_columns
+def create_columns(data, meta, years):
+    """
+    Primary energy per source in the policy scenario, and FFR
+    """
 
     policy_scenario = "diag-c80-gr5"
-    new_meta = meta.copy()
-    created_columns = []
+    columns = {}
 
-    for year in years:
+    ### First calculate fossil fuel energy values (model x year)
 
-        ### First calculate fossil fuel energy values
+    energy = {
+        var_suffix: get(
+            data, policy_scenario, f"Primary Energy|{var_suffix}", years
+        ).reindex(meta.index)
+        for var_suffix in VARIABLES + ["Fossil", "Biomass"]
+    }
 
-        for var_suffix in VARIABLES:
-            var = f"Primary Energy|{var_suffix}"
-            col = f"{var} {year}"
-            new_meta[col] = get(data, policy_scenario, var, year)
-            created_columns += [col]
+    # Replace w/o CCS variables by full variable if w/ CCS data is missing:
+    for fuel in ["Fossil", "Biomass"]:
+        missing = energy[f"{fuel}|w/ CCS"].isna()
+        energy[f"{fuel}|w/o CCS"] = energy[f"{fuel}|w/o CCS"].mask(
+            missing, energy[fuel]
+        )
 
-        # Replace w/o CCS variables by full variable if w/ CCS data is missing:
-        for fuel in ["Fossil", "Biomass"]:
-            var = f"Primary Energy|{fuel}"
-            col = f"{var} {year}"
-            new_meta[col] = get(data, policy_scenario, var, year)
-            missing = new_meta[f"{var}|w/ CCS {year}"].isna()
-            new_meta.loc[missing, f"{var}|w/o CCS {year}"] = new_meta.loc[missing, col]
-            created_columns += [col]
+    ### Then calculate fossil fuel reduction
+    FFR = calc_fossil_fuel_reduction(data, years, policy_scenario)
 
-        ### Then calculate fossil fuel reduction
-        col_FFR = f"FFR {year}"
-        new_meta[col_FFR] = calc_fossil_fuel_reduction(data, year, policy_scenario)
-        created_columns += [col_FFR]
-
-    if not mute:
-        print(f"Created columns: {created_columns}\n")
+    for year in years:
+        for var_suffix in VARIABLES + ["Fossil", "Biomass"]:
+            col = f"Primary Energy|{var_suffix} {year}"
+            columns[col] = energy[var_suffix][year]
 
-    return new_meta
+        columns[f"FFR {year}"] = FFR[year]
 
+    return columns
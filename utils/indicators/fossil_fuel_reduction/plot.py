@@ -1,10 +1,14 @@
 import numpy as np
 from plotly.subplots import make_subplots
 from utils.plot.general import add_model_comparison
+from utils.instrumentation import instrumented
 from .calculate import VARIABLES, LABELS
 
 
-def create_fig(meta, models, year: str, xrange=None, exclude_models=None):
+@instrumented()
+def create_fig(
+    meta, models, year: str, xrange=None, exclude_models=None, webgl=None, **kwargs
+):
 
     if exclude_models is not None:
         models = models[~models["Full model"].str.contains(exclude_models)].copy()
@@ -105,6 +109,8 @@ def create_fig(meta, models, year: str, xrange=None, exclude_models=None):
         shared_yaxes=True,
         showlegendlines=False,
         exclude_models=exclude_models,
+        webgl=webgl,
+        **kwargs,
     )
 
     # Update layout
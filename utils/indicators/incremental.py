@@ -0,0 +1,118 @@
+"""
+Incremental computation of the indicator columns
+
+For each model, a fingerprint is computed of everything the indicators
+read for that model: its rows in `data` for the required (scenario,
+variable) pairs, its row in the meta dataframe, and the indicators and
+years that are computed. The computed columns are stored together with
+the fingerprints, such that on the next run only models with a changed
+fingerprint are recomputed.
+"""
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+from utils.data.handling import select
+from .engine import INDICATORS, create_all_columns
+
+FINGERPRINT_COLUMN = "_fingerprint"
+
+
+def create_all_columns_incremental(
+    data, meta, cache_file, indicators=None, years=["2050", "2100"], mute=False
+):
+    """
+    Same as `create_all_columns`, but reuses the values stored in `cache_file`
+    (a pickle file) for models whose inputs did not change, and updates it.
+    """
+    if indicators is None:
+        indicators = list(INDICATORS)
+    keys = set()
+    for name in indicators:
+        keys |= INDICATORS[name].requirements(meta)
+    rows = select(data, keys)
+
+    fingerprints = model_fingerprints(
+        rows, meta, settings=f"{sorted(indicators)}|{list(years)}"
+    )
+
+    cache = pd.read_pickle(cache_file) if os.path.exists(cache_file) else None
+    if cache is not None:
+        cached = cache[FINGERPRINT_COLUMN].reindex(meta.index)
+        changed = meta.index[cached != fingerprints]
+    else:
+        changed = meta.index
+
+    if not mute:
+        print(f"Recomputing {len(changed)} of {len(meta)} models\n")
+
+    if len(changed) > 0:
+        computed = create_all_columns(
+            rows[_row_ids(rows, meta).isin(changed)],
+            meta.loc[changed],
+            indicators,
+            years=years,
+            mute=mute,
+        )
+        new_columns = computed.columns.difference(meta.columns, sort=False)
+        computed = computed[new_columns]
+    else:
+        new_columns = cache.columns.drop(FINGERPRINT_COLUMN)
+        computed = cache.loc[[], new_columns]
+
+    unchanged = meta.index.difference(changed, sort=False)
+    if len(unchanged) > 0:
+        computed = pd.concat([computed, cache.loc[unchanged, new_columns]])
+
+    new_cache = computed.reindex(meta.index)
+    new_cache[FINGERPRINT_COLUMN] = fingerprints
+    new_cache.to_pickle(cache_file)
+
+    return meta.join(computed.reindex(meta.index))
+
+
+def model_fingerprints(rows, meta, settings=""):
+    """
+    Hash per model (Series indexed like meta) of its rows in `rows`,
+    its row in `meta` and a string with other `settings`
+    """
+    id_columns = _id_columns(meta) + ["Scenario", "Variable"]
+    year_columns = [col for col in rows.columns if str(col).isdigit()]
+    rows = rows[id_columns + year_columns]
+    rows = rows.astype({col: str for col in id_columns})
+    rows = rows.sort_values(id_columns, kind="stable").reset_index(drop=True)
+    row_hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+
+    # Rows are sorted, so the rows of each model are contiguous
+    codes, labels = _row_ids(rows, meta).factorize()
+    bounds = np.searchsorted(codes, np.arange(len(labels) + 1))
+    model_positions = {
+        label: slice(start, stop)
+        for label, start, stop in zip(labels, bounds[:-1], bounds[1:])
+    }
+    meta_hashes = pd.util.hash_pandas_object(meta.astype(str), index=True)
+
+    fingerprints = []
+    for model, meta_hash in zip(meta.index, meta_hashes.to_numpy()):
+        digest = hashlib.sha1(settings.encode())
+        digest.update(np.uint64(meta_hash).tobytes())
+        positions = model_positions.get(model)
+        if positions is not None:
+            digest.update(row_hashes[positions].tobytes())
+        fingerprints.append(digest.hexdigest())
+    return pd.Series(fingerprints, index=meta.index)
+
+
+def _id_columns(meta):
+    return ["Model", "Region"] if "Region" in meta.index.names else ["Model"]
+
+
+def _row_ids(rows, meta):
+    """
+    Labels of the rows in the index of meta: Model, or (Model, Region)
+    """
+    if "Region" in meta.index.names:
+        return pd.MultiIndex.from_frame(rows[_id_columns(meta)].astype(str))
+    return pd.Index(rows["Model"].astype(str))
@@ -1,10 +1,30 @@
-import numpy as np
-from utils.data.handling import get
+from utils.data.handling import get, indicator_columns
+from utils.instrumentation import instrumented
+
+SCENARIOS = ["diag-base", "diag-c30-gr5", "diag-c80-gr5"]
+VARIABLES = {
+    "Emissions|CO2|Energy and Industrial Processes": "CO2 FFI",
+    "Emissions|Kyoto Gases": "Kyoto",
+}
+
+
+def requirements(meta, vars=VARIABLES, include_c30=True, **kwargs):
+    """
+    (scenario, variable) pairs used by `create_columns`
+    """
+    scenarios = SCENARIOS if include_c30 else [SCENARIOS[0], SCENARIOS[2]]
+    return {(scenario, var) for scenario in scenarios for var in vars} | {
+        (scenario, "Price|Carbon") for scenario in scenarios[1:]
+    }
 
 
 def calc_relative_abatement_index(
     data, year, var, pol="diag-c80-gr5", base="diag-base",
 ):
+    """
+    RAI for a single year (Series) or for a list of years
+    (model x year DataFrame)
+    """
 
     # Get CO2 FFI Base and Pol
     CO2_FFI_base = get(data, base, var, year)
@@ -13,49 +33,44 @@ def calc_relative_abatement_index(
     return (CO2_FFI_base - CO2_FFI_pol) / CO2_FFI_base
 
 
-def create_columns(
-    data,
-    meta,
-    years=["2050", "2100"],
-    vars={
-        "Emissions|CO2|Energy and Industrial Processes": "CO2 FFI",
-        "Emissions|Kyoto Gases": "Kyoto",
-    },
-    mute=False,
-):
+def calc_carbon_price(data, years, pol):
+    """
+    Carbon price (model x year), where a price of zero is considered missing
+    """
+    cprice = get(data, pol, "Price|Carbon", years)
+    return cprice.where(cprice != 0)
+
 
-    new_meta = meta.copy()
+@instrumented()
+@indicator_columns
+def create_columns(data, meta, years, vars=VARIABLES, include_c30=True):
+    """
+    RAI and carbon price of the c30 and c80 scenarios
 
-    created_columns = []
+    include_c30 [True]: also create the columns of the c30 scenario
+    """
+
+    columns = {}
+
+    policies = {"c30": "diag-c30-gr5", "c80": "diag-c80-gr5"}
+    if not include_c30:
+        del policies["c30"]
+    cprices = {
+        label: calc_carbon_price(data, years, pol) for label, pol in policies.items()
+    }
 
     for var_name, var_label in vars.items():
 
+        # Calculate indicators for all years at once
+        RAI = {
+            label: calc_relative_abatement_index(data, years, var_name, pol=pol)
+            for label, pol in policies.items()
+        }
+
         for year in years:
-            # Calculate indicators
-            col_c30_RAI = f"RAI c30 {year} {var_label}"
-            col_c80_RAI = f"RAI c80 {year} {var_label}"
-            col_c30_cprice = f"Carbon price c30 {year}"
-            col_c80_cprice = f"Carbon price c80 {year}"
-
-            new_meta[col_c30_RAI] = calc_relative_abatement_index(
-                data, year, var_name, pol="diag-c30-gr5"
-            )
-            new_meta[col_c80_RAI] = calc_relative_abatement_index(
-                data, year, var_name, pol="diag-c80-gr5"
-            )
-            new_meta[col_c30_cprice] = get(data, "diag-c30-gr5", "Price|Carbon", year)
-            new_meta[col_c80_cprice] = get(data, "diag-c80-gr5", "Price|Carbon", year)
-            new_meta.loc[new_meta[col_c30_cprice] == 0, col_c30_cprice] = np.nan
-            new_meta.loc[new_meta[col_c80_cprice] == 0, col_c80_cprice] = np.nan
-
-            created_columns += [
-                col_c30_RAI,
-                col_c80_RAI,
-                col_c30_cprice,
-                col_c80_cprice,
-            ]
-
-    if not mute:
-        print(f"Created columns: {created_columns}\n")
-
-    return new_meta
+            for label in policies:
+                columns[f"RAI {label} {year} {var_label}"] = RAI[label][year]
+            for label in policies:
+                columns[f"Carbon price {label} {year}"] = cprices[label][year]
+
+    return columns
@@ -1,8 +1,15 @@
 import numpy as np
 from plotly.subplots import make_subplots
-from utils.plot.general import add_model_comparison, GRIDCOLOR
+from utils.plot.general import (
+    add_model_comparison,
+    add_connected_dots,
+    use_webgl,
+    GRIDCOLOR,
+)
+from utils.instrumentation import instrumented
 
 
+@instrumented()
 def create_fig(
     meta,
     models,
@@ -11,8 +18,10 @@ def create_fig(
     narrative_left="Less CO<sub>2</sub> reduction",
     narrative_right="More CO<sub>2</sub> reduction",
     xrange=None,
+    webgl=None,
     **kwargs,
 ):
+    webgl = use_webgl(webgl, len(meta))
 
     # Calculate indicators
     col_c30_RAI = f"RAI c30 {year} {var_label}"
@@ -43,30 +52,33 @@ def create_fig(
     for is_newest, selection in meta[~meta[curr_cols].isna().any(axis=1)].groupby(
         "Newest"
     ):
-        for i, (model, info) in enumerate(selection.iterrows()):
-            stripped_model = info["Stripped model"]
-
-            if stripped_model not in models.index:
-                # Ignore entries that are not in `models`
-                continue
-
-            color = models.loc[stripped_model, "Color"] if is_newest else "#DDD"
-            label = info["Stripped model"] if is_newest else "Older model version"
-            dash = "solid"
+        # Ignore entries that are not in `models`
+        selection = selection[selection["Stripped model"].isin(models.index)]
+        colors = (
+            selection["Stripped model"].map(models["Color"]) if is_newest else "#DDD"
+        )
+        label = selection["Stripped model"] if is_newest else "Older model version"
 
-            fig_RAI.add_scatter(
-                x=[0, info[col_c30_RAI], info[col_c80_RAI]],
-                # y=[0, info[col_c30_cprice], info[col_c80_cprice]],
-                # Hardcoded carbon price:
-                y=[0, 48.86, 130.31],
-                line={"color": color, "dash": dash},
-                mode="lines",
-                name=label,
-                legendgroup=label,
-                showlegend=False,
-                row=1,
-                col=col_RAI_vs_cprice,
-            )
+        add_connected_dots(
+            fig_RAI,
+            np.column_stack(
+                [
+                    np.zeros(len(selection)),
+                    selection[col_c30_RAI],
+                    selection[col_c80_RAI],
+                ]
+            ),
+            # [0, selection[col_c30_cprice], selection[col_c80_cprice]],
+            # Hardcoded carbon price:
+            np.tile([0, 48.86, 130.31], (len(selection), 1)),
+            np.broadcast_to(colors, len(selection)),
+            np.broadcast_to(label, len(selection)),
+            markers=False,
+            line_width=2,
+            row=1,
+            col=col_RAI_vs_cprice,
+            webgl=webgl,
+        )
 
     ##############
     # 1b: RAI based on c80
@@ -80,6 +92,7 @@ def create_fig(
         col_c80_RAI,
         narrative_left=narrative_left,
         narrative_right=narrative_right,
+        webgl=webgl,
         **kwargs,
     )
 
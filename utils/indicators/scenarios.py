@@ -0,0 +1,219 @@
+"""
+Indicators for every policy scenario in a snapshot
+
+The indicators are defined for one policy scenario (diag-c80-gr5) and its
+baseline (diag-base). A scenario mapping {policy scenario: baseline scenario}
+specifies which other scenarios to evaluate. All policy scenarios are
+stacked into a single cube (ScenarioStack) in which the model dimension
+contains (model, policy scenario) pairs, with the policy values under the
+name diag-c80-gr5 and the values of the corresponding baseline under
+diag-base. The stack is a view on the cube of the snapshot, such that each
+baseline is stored once, however many policy scenarios use it. Each
+indicator is then evaluated once on this stack, for all policy scenarios at
+the same time.
+
+ - scenario_mapping: maps all scenarios of a snapshot to a baseline
+ - create_scenario_table: long table (model, scenario, year, indicator, value)
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.data.cube import DataCube
+from utils.data.handling import select
+from .engine import INDICATORS
+
+POLICY = "diag-c80-gr5"
+BASELINE = "diag-base"
+
+# For each indicator: name in the table -> column created by `create_columns`
+INDICATOR_COLUMNS = {
+    "RAI": {
+        "RAI CO2 FFI": "RAI c80 {year} CO2 FFI",
+        "RAI Kyoto": "RAI c80 {year} Kyoto",
+        "Carbon price": "Carbon price c80 {year}",
+    },
+    "CoEI": {
+        "Carbon intensity reduction": "Carbon intensity {year}",
+        "Energy intensity reduction": "Energy intensity {year}",
+        "CoEI": "CoEI {year}",
+    },
+    "FFR": {"FFR": "FFR {year}"},
+    "CAV": {
+        "Policy cost": "Policy cost {year}",
+        "Policy cost per GDP": "Policy cost {year} per GDP",
+        "CAV": "CAV {year}",
+    },
+}
+
+# Options of `create_columns` for the stacked scenarios: the c30 columns of RAI
+# do not apply to the stack
+INDICATOR_KWARGS = {"RAI": {"include_c30": False}}
+
+# Options for the policy scenarios other than diag-c80-gr5: the hardcoded
+# carbon prices of CAV only apply to diag-c80-gr5, for the other scenarios the
+# carbon price reported by each model is used
+OTHER_POLICY_KWARGS = {"CAV": {"cprices": {}}}
+
+
+def scenario_mapping(data, baseline=BASELINE):
+    """
+    Maps every scenario in `data` (except the baselines, whose names start
+    with `baseline`) to `baseline`
+    """
+    scenarios = data["Scenario"].astype(str).unique()
+    return {
+        scenario: baseline
+        for scenario in scenarios
+        if not scenario.startswith(baseline)
+    }
+
+
+def create_scenario_table(
+    data, meta, mapping=None, indicators=None, years=["2050", "2100"]
+):
+    """
+    Calculates the indicators for each policy scenario in `mapping`
+    ({policy scenario: baseline scenario}, default: `scenario_mapping(data)`).
+
+    Returns a long dataframe with columns Model (and Region, if meta is
+    indexed by Model and Region), Scenario, Year, Indicator and Value.
+    Missing values are left out.
+    """
+    if mapping is None:
+        mapping = scenario_mapping(data)
+    if indicators is None:
+        indicators = list(INDICATOR_COLUMNS)
+    years = list(dict.fromkeys(years))
+
+    variables = set()
+    for name in indicators:
+        variables |= {
+            variable
+            for _, variable in INDICATORS[name].requirements(
+                meta, **INDICATOR_KWARGS.get(name, {})
+            )
+        }
+    scenarios = set(mapping) | set(mapping.values())
+    cube = DataCube.from_data(
+        select(data, {(scenario, var) for scenario in scenarios for var in variables}),
+        scenarios=sorted(scenarios),
+        variables=sorted(variables),
+        by_region="Region" in meta.index.names,
+    )
+
+    stacked = stack_scenarios(cube, mapping)
+    stacked_meta = _stack_meta(meta, stacked.models)
+
+    own_rows = stacked_meta.index.get_level_values("Scenario") == POLICY
+
+    tables = []
+    for name in indicators:
+        module = INDICATORS[name]
+        kwargs = dict(
+            years=years,
+            mute=True,
+            new_columns_only=True,
+            **INDICATOR_KWARGS.get(name, {})
+        )
+        columns = module.create_columns(
+            stacked, stacked_meta, **kwargs, **OTHER_POLICY_KWARGS.get(name, {})
+        )
+        if name in OTHER_POLICY_KWARGS and own_rows.any():
+            # Same values as the columns of `create_columns` on the snapshot
+            columns[own_rows] = module.create_columns(
+                stacked, stacked_meta[own_rows], **kwargs
+            )
+        for label, column in INDICATOR_COLUMNS[name].items():
+            values = pd.DataFrame(
+                {year: columns[column.format(year=year)] for year in years}
+            )
+            values.columns.name = "Year"
+            table = values.stack().rename("Value").reset_index()
+            table.insert(len(table.columns) - 1, "Indicator", label)
+            tables.append(table)
+
+    return pd.concat(tables, ignore_index=True)
+
+
+def stack_scenarios(cube: DataCube, mapping):
+    """
+    ScenarioStack with (model, policy scenario) pairs as models, and the
+    scenarios POLICY (values of the policy scenario) and BASELINE (values of
+    its baseline)
+    """
+    policies = [scenario for scenario in mapping if scenario in cube.scenarios]
+    baselines = [mapping[scenario] for scenario in policies]
+    n_models, n_policies = len(cube.models), len(policies)
+
+    # Position of the policy and baseline scenario (-1: missing) for each pair
+    scenario_positions = np.column_stack(
+        [cube.scenarios.get_indexer(policies), cube.scenarios.get_indexer(baselines)]
+    )
+
+    models = cube.models.to_frame(index=False)
+    models = models.loc[np.repeat(np.arange(n_models), n_policies)]
+    models["Scenario"] = np.tile(np.asarray(policies, dtype=object), n_models)
+
+    return ScenarioStack(
+        cube,
+        pd.MultiIndex.from_frame(models),
+        np.repeat(np.arange(n_models), n_policies),
+        np.tile(scenario_positions, (n_models, 1)),
+    )
+
+
+class ScenarioStack(DataCube):
+    """
+    DataCube with (model, policy scenario) pairs as models and the scenarios
+    POLICY and BASELINE, as a view on `cube`: the values are only gathered
+    for the variables and years that are selected.
+
+    model_positions:    position in `cube.models` of each pair
+    scenario_positions: pairs x 2 array with the position in `cube.scenarios` of
+                        the policy and baseline scenario of each pair (-1: missing)
+    """
+
+    def __init__(self, cube: DataCube, models, model_positions, scenario_positions):
+        super().__init__(
+            cube.values,
+            models,
+            pd.Index([POLICY, BASELINE], name="Scenario"),
+            cube.variables,
+            cube.years,
+        )
+        self.model_positions = model_positions
+        self.scenario_positions = scenario_positions
+
+    def sel(self, model=None, scenario=None, variable=None, year=None):
+        # Variables and years are selected in the underlying cube
+        values = super().sel(variable=variable, year=year)
+
+        pairs = np.arange(len(self.models))[self._indexer("model", model)]
+        scenario_pos = self.scenario_positions[pairs][
+            ..., self._indexer("scenario", scenario)
+        ]
+        model_pos = self.model_positions[pairs]
+        if np.ndim(scenario_pos) > np.ndim(model_pos):
+            model_pos = model_pos[..., None]
+
+        result = values[model_pos, np.maximum(scenario_pos, 0)]
+        missing = np.reshape(
+            scenario_pos == -1,
+            np.shape(scenario_pos) + (1,) * (result.ndim - np.ndim(scenario_pos)),
+        )
+        return np.where(missing, np.nan, result)
+
+
+def _stack_meta(meta, stacked_models):
+    """
+    Meta dataframe with a row for each (model, policy scenario) pair. The
+    columns of specific years (indicator values of diag-c80-gr5, which CAV
+    would reuse) are left out.
+    """
+    meta = meta.loc[:, ~meta.columns.astype(str).str.contains(r"\b\d{4}\b")]
+    model_labels = stacked_models.droplevel("Scenario")
+    in_meta = model_labels.isin(meta.index)
+    stacked_meta = meta.reindex(model_labels[in_meta])
+    stacked_meta.index = stacked_models[in_meta]
+    return stacked_meta
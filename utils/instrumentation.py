@@ -0,0 +1,191 @@
+"""
+Opt-in timing and memory instrumentation of the pipeline stages
+
+Functions decorated with `instrumented` (import_data, create_meta_df, the
+create_columns and create_fig of each indicator, ...) are only measured
+inside an `instrument` block; otherwise they are called directly.
+
+    with instrument("report.json") as report:
+        data = import_data(...)
+        ...
+    print(report.summary())
+
+For each call the wall time, CPU time, peak resident memory during the
+stage and the number of rows of the input and output dataframes are
+recorded. Nested stages (e.g. _prepare_data within import_data) are recorded
+separately, with their depth. Stages which raise an exception are recorded
+with the name of the exception as "error".
+
+The peak memory of a stage is measured by resetting the high-water mark of
+the process at the start of the stage (Linux). Where this is not possible,
+the peak of the whole process so far is recorded instead.
+"""
+
+import sys
+import json
+import time
+import functools
+import contextlib
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Reports of the currently active `instrument` blocks
+_REPORTS = []
+
+# Peak memory so far (MB) of each running stage, innermost last
+_PEAKS = []
+
+# Whether the high-water mark can be reset (Linux), determined on first use
+_can_reset_peak = None
+
+
+class Report:
+    """
+    Measurements of the stages called within an `instrument` block,
+    in the order in which the stages were started
+    """
+
+    def __init__(self):
+        self.stages = []
+        self._depth = 0
+
+    def to_dict(self):
+        return {"stages": self.stages}
+
+    def to_json(self, filename):
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def summary(self):
+        """
+        Total wall and CPU time, number of calls (and of failed calls) and
+        highest peak memory per stage
+        """
+        if not self.stages:
+            return pd.DataFrame()
+        return (
+            pd.DataFrame(self.stages)
+            .groupby("stage", sort=False)
+            .agg(
+                calls=("wall_time", "size"),
+                errors=("error", "count"),
+                wall_time=("wall_time", "sum"),
+                cpu_time=("cpu_time", "sum"),
+                peak_rss_mb=("peak_rss_mb", "max"),
+            )
+        )
+
+
+@contextlib.contextmanager
+def instrument(json_filename=None):
+    """
+    Records the instrumented stages called within the block. The report
+    is written to `json_filename` (if given) at the end of the block.
+    """
+    report = Report()
+    _REPORTS.append(report)
+    try:
+        yield report
+    finally:
+        _REPORTS.remove(report)
+        if json_filename is not None:
+            report.to_json(json_filename)
+
+
+def instrumented(stage=None):
+    """
+    Decorator to record the calls of a function in the active reports.
+    stage [None]: name in the report (default: module and function name)
+    """
+
+    def decorator(function):
+        module = function.__module__.replace("utils.", "", 1)
+        name = stage or f"{module}.{function.__name__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _REPORTS:
+                return function(*args, **kwargs)
+
+            record = {"stage": name, "depth": _REPORTS[-1]._depth, "error": None}
+            for report in _REPORTS:
+                report.stages.append(record)
+                report._depth += 1
+            result = None
+            _start_peak()
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            try:
+                result = function(*args, **kwargs)
+                return result
+            except BaseException as error:
+                record["error"] = type(error).__name__
+                raise
+            finally:
+                record["wall_time"] = time.perf_counter() - wall_start
+                record["cpu_time"] = time.process_time() - cpu_start
+                record["peak_rss_mb"] = _end_peak()
+                for report in _REPORTS:
+                    report._depth -= 1
+                inputs = [arg for arg in args if isinstance(arg, pd.DataFrame)]
+                record["rows_in"] = len(inputs[0]) if inputs else None
+                record["rows_out"] = (
+                    len(result) if isinstance(result, pd.DataFrame) else None
+                )
+
+        return wrapper
+
+    return decorator
+
+
+def _start_peak():
+    """
+    Resets the high-water mark of the process for a new stage. The peak so
+    far is kept for the enclosing stage.
+    """
+    if _PEAKS and _PEAKS[-1] is not None:
+        _PEAKS[-1] = max(_PEAKS[-1], _peak_rss_mb())
+    _PEAKS.append(None if resource is None else 0.0)
+    _reset_peak()
+
+
+def _end_peak():
+    """
+    Peak memory of the stage which ends, also counted for the enclosing stage
+    """
+    peak = _PEAKS.pop()
+    if peak is None:
+        return None
+    peak = max(peak, _peak_rss_mb())
+    if _PEAKS and _PEAKS[-1] is not None:
+        _PEAKS[-1] = max(_PEAKS[-1], peak)
+    return peak
+
+
+def _reset_peak():
+    global _can_reset_peak
+    if _can_reset_peak is False:
+        return
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        _can_reset_peak = True
+    except OSError:
+        _can_reset_peak = False
+
+
+def _peak_rss_mb():
+    if _can_reset_peak:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    if resource is None:
+        return None
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 ** 2 if sys.platform == "darwin" else maxrss / 1024
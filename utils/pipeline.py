@@ -0,0 +1,129 @@
+"""
+Runs the full diagnostics pipeline (import, meta, indicators) for one
+or more snapshots.
+
+ - load_snapshot: pre-processed data and meta dataframe of a snapshot, to
+   calculate several outputs (e.g. indicators and scenario table) from
+ - run_pipeline: single snapshot, returns the meta dataframe
+ - run_snapshots: several snapshots in parallel (process pool), returns
+   one combined dataframe with the snapshot as extra index level
+ - run_scenario_table: single snapshot, indicators of every policy scenario
+   as a long table (see `create_scenario_table`)
+"""
+
+import os
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+from utils.data.prepocessing import import_data
+from utils.data.meta import create_meta_df
+from utils.indicators.engine import create_all_columns
+from utils.indicators.incremental import create_all_columns_incremental
+from utils.indicators.scenarios import create_scenario_table
+
+
+def load_snapshot(
+    data_filename: str,
+    model_versions_filename: str,
+    manual_model_renames: Optional[dict] = None,
+    cache_dir: Optional[str] = None,
+    regions=None,
+):
+    """
+    Returns the pre-processed data and the meta dataframe (without indicators)
+    of a snapshot. See `run_pipeline` for the arguments.
+    """
+    data = import_data(
+        data_filename, manual_model_renames, cache_dir=cache_dir, regions=regions
+    )
+    meta = create_meta_df(data, model_versions_filename, by_region=regions is not None)
+    return data, meta
+
+
+def run_pipeline(
+    data_filename: str,
+    model_versions_filename: str,
+    manual_model_renames: Optional[dict] = None,
+    indicators=None,
+    years=["2050", "2100"],
+    cache_dir: Optional[str] = None,
+    columns_cache: Optional[str] = None,
+    regions=None,
+    mute=True,
+):
+    """
+    cache_dir [None]:     folder to cache the pre-processed data (see `import_data`)
+    columns_cache [None]: file to store the indicator values in, such that
+            only models with changed inputs are recomputed on the next run
+            (see `create_all_columns_incremental`)
+    regions [None]:       list of regions (or "all") to calculate the indicators
+            for, giving a meta dataframe indexed by Model and Region
+    """
+    data, meta = load_snapshot(
+        data_filename, model_versions_filename, manual_model_renames, cache_dir, regions
+    )
+    if columns_cache is not None:
+        return create_all_columns_incremental(
+            data, meta, columns_cache, indicators, years=years, mute=mute
+        )
+    return create_all_columns(data, meta, indicators, years=years, mute=mute)
+
+
+def run_snapshots(snapshots, max_workers=None, **kwargs):
+    """
+    snapshots:   list of (data filename, model versions filename) pairs
+    max_workers: number of processes (default: number of CPUs)
+    **kwargs:    passed to `run_pipeline` for each snapshot
+
+    Returns the meta dataframes of all snapshots, concatenated, with index
+    levels Snapshot (path of the data file, relative to the folder which
+    contains all data files) and Model. The column "Model versions file"
+    records which versions file was used.
+    """
+    labels = _snapshot_labels([data_filename for data_filename, _ in snapshots])
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_pipeline, data_filename, versions_filename, **kwargs)
+            for data_filename, versions_filename in snapshots
+        ]
+        metas = [future.result() for future in futures]
+
+    for meta, (data_filename, versions_filename) in zip(metas, snapshots):
+        meta.insert(0, "Model versions file", os.path.basename(versions_filename))
+
+    return pd.concat(metas, keys=labels, names=["Snapshot"], sort=False,)
+
+
+def _snapshot_labels(data_filenames):
+    """
+    Paths of the data files relative to their common folder, such that
+    snapshots with the same file name in different folders are kept apart
+    """
+    paths = [os.path.abspath(filename) for filename in data_filenames]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    labels = [os.path.relpath(path, root) for path in paths]
+    duplicates = sorted({label for label in labels if labels.count(label) > 1})
+    if duplicates:
+        raise ValueError(f"Data files given more than once: {', '.join(duplicates)}")
+    return labels
+
+
+def run_scenario_table(
+    data_filename: str,
+    model_versions_filename: str,
+    manual_model_renames: Optional[dict] = None,
+    mapping: Optional[dict] = None,
+    indicators=None,
+    years=["2050", "2100"],
+    cache_dir: Optional[str] = None,
+    regions=None,
+):
+    """
+    mapping [None]: {policy scenario: baseline scenario}, by default all
+            scenarios are compared to diag-base (see `scenario_mapping`)
+    """
+    data, meta = load_snapshot(
+        data_filename, model_versions_filename, manual_model_renames, cache_dir, regions
+    )
+    return create_scenario_table(data, meta, mapping, indicators, years=years)
@@ -0,0 +1,218 @@
+"""
+Export of figures to image files (PNG, PDF, ...) and to a static HTML page
+
+ - export_figures: renders a set of figures concurrently in a process pool.
+   Each worker renders its share of the figures in a single call to
+   `plotly.io.write_images` (Kaleido >= 1, which starts a browser per call),
+   or one by one with the Kaleido scope of the worker (older versions).
+   Figures that did not change since the previous export (same figure JSON,
+   format and scale) are not rendered again.
+ - export_dashboard: writes a set of figures to a single interactive HTML page
+"""
+
+import os
+import html
+import gzip
+import json
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Hashes of the exported figures, stored in the output folder
+MANIFEST_FILENAME = ".figure_hashes.json"
+
+# Size of the figures without a width or height in their layout (Plotly default)
+DEFAULT_SIZE = (700, 450)
+
+
+def export_figures(
+    figures: dict, output_dir, formats=("png", "pdf"), scale=4, max_workers=None
+):
+    """
+    figures:     dictionary of file name (without extension) -> Plotly figure
+    output_dir:  folder to write the images to
+    formats:     image formats to export each figure to
+    scale:       scale of the bitmap formats (PNG, JPG, WEBP)
+    max_workers: number of processes (default: number of CPUs)
+
+    Returns the list of paths which were (re-)rendered.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    jobs = []
+    for name, fig in figures.items():
+        fig_json = fig.to_json()
+        for image_format in formats:
+            filename = f"{name}.{image_format}"
+            path = os.path.join(output_dir, filename)
+            file_scale = scale if image_format in ["png", "jpg", "jpeg", "webp"] else 1
+            digest = hashlib.sha256(
+                f"{fig_json}|{image_format}|{file_scale}".encode()
+            ).hexdigest()
+            if manifest.get(filename) == digest and os.path.exists(path):
+                continue
+            jobs.append((fig_json, path, image_format, file_scale, filename, digest))
+
+    if len(jobs) > 0:
+        n_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        bounds = [len(jobs) * i // n_workers for i in range(n_workers + 1)]
+        batches = [jobs[start:stop] for start, stop in zip(bounds, bounds[1:])]
+        with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker
+        ) as executor:
+            futures = [
+                executor.submit(_render, [job[:4] for job in batch])
+                for batch in batches
+            ]
+            for future, batch in zip(futures, batches):
+                future.result()
+                for job in batch:
+                    manifest[job[4]] = job[5]
+
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+
+    return [job[1] for job in jobs]
+
+
+def _init_worker():
+    from utils.plot.general import configure_export
+
+    configure_export()
+
+
+def _render(jobs):
+    """
+    jobs: list of (figure JSON, path, format, scale)
+    """
+    import plotly.io as pio
+
+    figs = [pio.from_json(job[0]) for job in jobs]
+    if not hasattr(pio, "write_images"):
+        # Plotly < 6: the Kaleido scope of the worker is reused between figures
+        for fig, (_, path, image_format, scale) in zip(figs, jobs):
+            fig.write_image(path, format=image_format, scale=scale)
+        return
+
+    # write_images does not use the size of the figure layout by itself
+    pio.write_images(
+        figs,
+        [job[1] for job in jobs],
+        format=[job[2] for job in jobs],
+        scale=[job[3] for job in jobs],
+        width=[fig.layout.width or DEFAULT_SIZE[0] for fig in figs],
+        height=[fig.layout.height or DEFAULT_SIZE[1] for fig in figs],
+    )
+
+
+def export_dashboard(
+    figures: dict, filename, title="Diagnostic indicators", include_plotlyjs="directory"
+):
+    """
+    Writes all figures to a single static HTML page. The figure JSON is
+    embedded gzip-compressed, and each figure is only decompressed and drawn
+    once it is scrolled into view. plotly.js is not embedded, but included as
+    a separate script which is shared by all dashboards (and cached by the
+    browser).
+
+    figures:          dictionary of figure title -> Plotly figure
+    filename:         HTML file to write
+    include_plotlyjs: "directory" (plotly.min.js is written next to `filename`),
+                      "cdn", or the URL of plotly.js
+
+    Returns the path of the HTML file.
+    """
+    folder = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(folder, exist_ok=True)
+    plotlyjs_src = _plotlyjs_src(include_plotlyjs, folder)
+
+    contents, sections = [], []
+    for i, (name, fig) in enumerate(figures.items()):
+        compressed = gzip.compress(fig.to_json().encode(), mtime=0)
+        width = fig.layout.width or DEFAULT_SIZE[0]
+        height = fig.layout.height or DEFAULT_SIZE[1]
+        contents.append(f'<li><a href="#figure-{i}">{html.escape(name)}</a></li>')
+        sections.append(
+            f'<section id="figure-{i}"><h2>{html.escape(name)}</h2>'
+            f'<div class="figure" style="width:{width}px;height:{height}px" '
+            f'data-figure="{base64.b64encode(compressed).decode()}"></div></section>'
+        )
+
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(
+            _DASHBOARD_TEMPLATE.format(
+                title=html.escape(title),
+                contents="\n".join(contents),
+                sections="\n".join(sections),
+                plotlyjs_src=html.escape(plotlyjs_src),
+            )
+        )
+    return filename
+
+
+def _plotlyjs_src(include_plotlyjs, folder):
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    if include_plotlyjs == "cdn":
+        return f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+    if include_plotlyjs == "directory":
+        # Versioned file name, such that browsers never use an outdated cached copy
+        plotlyjs_filename = f"plotly-{get_plotlyjs_version()}.min.js"
+        path = os.path.join(folder, plotlyjs_filename)
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(get_plotlyjs())
+        return plotlyjs_filename
+    return include_plotlyjs
+
+
+# Figures are drawn when they come within 500px of the visible part of the page
+_DASHBOARD_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+section {{ margin-bottom: 2em; }}
+.figure {{ max-width: 100%; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<ul>
+{contents}
+</ul>
+{sections}
+<script src="{plotlyjs_src}"></script>
+<script>
+function drawFigure(div) {{
+    var bytes = Uint8Array.from(atob(div.dataset.figure), function (c) {{
+        return c.charCodeAt(0);
+    }});
+    delete div.dataset.figure;
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    new Response(stream).json().then(function (fig) {{
+        Plotly.newPlot(div, fig.data, fig.layout, {{displaylogo: false}});
+    }});
+}}
+var observer = new IntersectionObserver(function (entries) {{
+    entries.forEach(function (entry) {{
+        if (entry.isIntersecting) {{
+            observer.unobserve(entry.target);
+            drawFigure(entry.target);
+        }}
+    }});
+}}, {{rootMargin: "500px"}});
+document.querySelectorAll("div[data-figure]").forEach(function (div) {{
+    observer.observe(div);
+}});
+</script>
+</body>
+</html>
+"""
@@ -1,24 +1,61 @@
 """
 General utils
  - add_legend_item: Adds Plotly legend item manually
+ - configure_export: fixes the default export size (called by add_model_comparison)
+ - use_webgl: whether to draw the points as WebGL (Scattergl) traces
+ - confidence_ellipse(s): outlines of the confidence ellipses of one or more
+   pairs of columns
 """
 
-import numpy as np
+import hashlib
 
+import numpy as np
+import pandas as pd
 
 import plotly.io as pio
 
 pio.templates.default = "none"
-try:
-    # Bugfix for Plotly default export size
-    pio.kaleido.scope.default_width = None
-    pio.kaleido.scope.default_height = None
-except:
-    pass
+
+_export_configured = False
+
+
+def configure_export():
+    """
+    Bugfix for Plotly default export size with Kaleido < 1, which otherwise
+    ignores the size of the figure layout. Accessing the Kaleido scope
+    initialises Kaleido, so this is done when the first figure is created
+    (or exported) instead of when importing this module. Plotly >= 6 has no
+    Kaleido scope, and uses the size of the layout by itself.
+    """
+    global _export_configured
+    if _export_configured:
+        return
+    _export_configured = True
+    scope = getattr(pio.kaleido, "scope", None)
+    if scope is not None:
+        scope.default_width = None
+        scope.default_height = None
 
 
 GRIDCOLOR = "rgba(.2,.2,.2,.1)"
 
+# Above this number of points (rows of meta), the figures use WebGL traces
+WEBGL_THRESHOLD = 1000
+# Number of points of the confidence ellipse outlines, and in WebGL mode
+ELLIPSE_POINTS = 120
+WEBGL_ELLIPSE_POINTS = 48
+
+
+def use_webgl(webgl, n_points):
+    """
+    Resolves the `webgl` option of the figures: True or False, or None to use
+    WebGL (Scattergl) traces only if there are more than WEBGL_THRESHOLD points.
+    SVG traces become slow in the browser for thousands of points.
+    """
+    if webgl is None:
+        return n_points > WEBGL_THRESHOLD
+    return bool(webgl)
+
 
 def add_model_comparison(
     fig,
@@ -34,6 +71,8 @@ def add_model_comparison(
     showlegendlines=True,
     labelshift=1,
     exclude_models=None,
+    batch_traces=False,
+    webgl=False,
 ):
     """
     Used to create the right part of each figure: the indicator comparison.
@@ -53,14 +92,24 @@ def add_model_comparison(
     labelshift:     shift the labels a bit more ( > 1) or less ( < 1) to the left.
     exclude_models: list of model names that should be excluded from this plot
     models:         by default the normal `models` dataframe, but can be used as override.
+    batch_traces [False]: draw the markers of all models as a single trace, the
+            legend lines as one trace per colour and the model type brackets as a
+            single trace, instead of several traces per model. The figure looks
+            the same, but is smaller and faster to render.
+    webgl [False]:  draw the markers as WebGL (Scattergl) traces. If None, this
+            is decided by `use_webgl` based on the number of points.
     """
 
+    configure_export()
+
     if exclude_models is not None:
         models = models[~models["Full model"].str.contains(exclude_models)].copy()
         models["i"] = np.arange(len(models))
 
     n = models["i"].max()
     meta_selection = meta[meta["Stripped model"].isin(models.index)]
+    webgl = use_webgl(webgl, len(meta_selection))
+    add_points = fig.add_scattergl if webgl else fig.add_scatter
 
     # Add legend items
     for name, symbol, size in [("Newest", "star", 8), ("Older version", "circle", 4)]:
@@ -104,12 +153,29 @@ def add_model_comparison(
     )
     label_width = 0.15 * (vmax - vmin) if label_width is None else label_width
 
+    if batch_traces:
+        _add_models_batched(
+            fig,
+            meta_selection,
+            models,
+            fig_col,
+            meta_col,
+            label_posx,
+            label_width,
+            showlegendlines,
+            add_points,
+        )
+
     for model, (modeltype, fullmodel, i, color) in models.iterrows():
 
+        if batch_traces:
+            _add_model_name(fig, model, label_posx, i, fig_col)
+            continue
+
         selection = meta_selection[meta_selection["Stripped model"] == model]
 
         # Add dots and stars
-        fig.add_scatter(
+        add_points(
             x=selection[meta_col],
             y=[i] * len(selection),
             marker={
@@ -141,16 +207,7 @@ def add_model_comparison(
             )
 
         # Name of model
-        fig.add_annotation(
-            text=model,
-            x=label_posx,
-            y=i,
-            xanchor="left",
-            row=1,
-            col=fig_col,
-            bgcolor="#FFF",
-            showarrow=False,
-        )
+        _add_model_name(fig, model, label_posx, i, fig_col)
 
     # Add model type brackets
     x_max = meta_selection[meta_col].max()
@@ -158,19 +215,27 @@ def add_model_comparison(
 
     x_right = 0.05 * dx + x_max  # 6% to the right of the most right point
     x_width = 0.03 * dx
+    bracket_x, bracket_y = [], []
     for modeltype, selection in models.groupby("Type"):
         first, last = selection["i"].min(), selection["i"].max()
         # Bracket itself
         dy = 0.3
-        fig.add_scatter(
-            x=[x_right, x_right + x_width, x_right + x_width, x_right],
-            y=[first - dy, first - dy, last + dy, last + dy],
-            mode="lines",
-            line_color="#999",
-            showlegend=False,
-            row=1,
-            col=fig_col,
-        )
+        x = [x_right, x_right + x_width, x_right + x_width, x_right]
+        y = [first - dy, first - dy, last + dy, last + dy]
+        if batch_traces:
+            # Separate the brackets by a gap (None)
+            bracket_x += x + [None]
+            bracket_y += y + [None]
+        else:
+            fig.add_scatter(
+                x=x,
+                y=y,
+                mode="lines",
+                line_color="#999",
+                showlegend=False,
+                row=1,
+                col=fig_col,
+            )
         # Name of model type
         fig.add_annotation(
             x=x_right + 1.25 * x_width,
@@ -185,6 +250,17 @@ def add_model_comparison(
             col=fig_col,
         )
 
+    if batch_traces:
+        fig.add_scatter(
+            x=bracket_x[:-1],
+            y=bracket_y[:-1],
+            mode="lines",
+            line_color="#999",
+            showlegend=False,
+            row=1,
+            col=fig_col,
+        )
+
     # Add narrative arrows
     for label, toLeft in [(narrative_left, True), (narrative_right, False)]:
         if label is None:
@@ -219,6 +295,72 @@ def add_model_comparison(
     ).update_layout(legend={"tracegroupgap": 0, "y": 0.5},)
 
 
+def _add_models_batched(
+    fig,
+    meta_selection,
+    models,
+    fig_col,
+    meta_col,
+    label_posx,
+    label_width,
+    showlegendlines,
+    add_points,
+):
+    """
+    Markers of all models in one trace (in the same order as when adding a
+    trace per model), and the legend lines per colour
+    """
+    model_order = pd.Series(np.arange(len(models)), index=models.index)
+    points = meta_selection.iloc[
+        np.argsort(
+            meta_selection["Stripped model"].map(model_order).to_numpy(), kind="stable"
+        )
+    ]
+    newest = points["Newest"].to_numpy(dtype=bool)
+
+    add_points(
+        x=points[meta_col],
+        y=points["Stripped model"].map(models["i"]),
+        marker={
+            "color": points["Stripped model"].map(models["Color"]),
+            "opacity": 1,
+            "symbol": np.where(newest, "star", "circle"),
+            "size": np.where(newest, 12, 7),
+            "line": {"color": "#FFF", "width": 1},
+        },
+        mode="markers",
+        showlegend=False,
+        row=1,
+        col=fig_col,
+    )
+
+    if showlegendlines:
+        # A line trace has a single colour: one trace (of separate segments) per colour
+        for color, selection in models.groupby("Color", sort=False):
+            fig.add_scatter(
+                x=np.tile([label_posx - label_width, label_posx, None], len(selection)),
+                y=np.repeat(selection["i"].to_numpy(), 3),
+                mode="lines",
+                line={"color": color, "width": 3},
+                row=1,
+                col=fig_col,
+                showlegend=False,
+            )
+
+
+def _add_model_name(fig, model, label_posx, i, fig_col):
+    fig.add_annotation(
+        text=model,
+        x=label_posx,
+        y=i,
+        xanchor="left",
+        row=1,
+        col=fig_col,
+        bgcolor="#FFF",
+        showarrow=False,
+    )
+
+
 def add_legend_item(fig, name="", mode="markers", **kwargs):
     """
     In Plotly, a legend item can be added manually by adding an empty trace
@@ -226,46 +368,155 @@ def add_legend_item(fig, name="", mode="markers", **kwargs):
     fig.add_scatter(x=[None], y=[None], name=name, mode=mode, **kwargs)
 
 
+def add_connected_dots(
+    fig,
+    x,
+    y,
+    colors,
+    names,
+    markers=True,
+    line_width=1,
+    row=None,
+    col=None,
+    webgl=False,
+):
+    """
+    Adds a line through the points of each row of `x` and `y` (rows x points
+    arrays), and optionally dots on the points (the first one filled, the others
+    white), using a fixed number of traces instead of one trace per row: one
+    trace per colour for the lines (rows separated by None) and one for all dots.
+
+    colors: colour of each row
+    names:  shown when hovering over the points of each row
+    webgl:  use WebGL (Scattergl) traces instead of SVG traces
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    colors, names = np.asarray(colors, dtype=object), np.asarray(names, dtype=object)
+    n_rows, n_points = x.shape
+    add_points = fig.add_scattergl if webgl else fig.add_scatter
+    hover = {
+        "hovertemplate": "(%{x}, %{y})<extra>%{text}</extra>",
+        "showlegend": False,
+        "row": row,
+        "col": col,
+    }
+
+    for color in pd.unique(colors):
+        rows = colors == color
+        segments_x = np.full((rows.sum(), n_points + 1), None, dtype=object)
+        segments_y = segments_x.copy()
+        segments_x[:, :n_points], segments_y[:, :n_points] = x[rows], y[rows]
+        add_points(
+            x=segments_x.ravel(),
+            y=segments_y.ravel(),
+            text=np.repeat(names[rows], n_points + 1),
+            line={"color": color, "width": line_width, "dash": "solid"},
+            mode="lines",
+            **hover,
+        )
+
+    if markers:
+        first = np.tile(np.arange(n_points) == 0, n_rows)
+        point_colors = np.repeat(colors, n_points)
+        add_points(
+            x=x.ravel(),
+            y=y.ravel(),
+            text=np.repeat(names, n_points),
+            marker={
+                "color": np.where(first, point_colors, "#FFF"),
+                "size": 8,
+                "line": {"color": point_colors, "width": 2},
+            },
+            mode="markers",
+            **hover,
+        )
+
+
 ##################
 ## Functions required to generate confidence ellipse
 ##################
 
 
-def ellipse(a, b, npoints):
-    x = np.linspace(-a, a, npoints)
-    y1 = b * np.sqrt(1 - (x / a) ** 2)
-    y2 = -y1
-    return np.concatenate([x, x[::-1]]), np.concatenate([y1, y2[::-1]])
-
+# Ellipses computed earlier, by hash of the input values (see `_ellipse_outlines`)
+_ELLIPSES = {}
+ELLIPSE_CACHE_SIZE = 64
 
-def rotate(x, y, theta):
-    return x * np.cos(theta) - y * np.sin(theta), x * np.sin(theta) + y * np.cos(theta)
 
+def confidence_ellipse(x_values, y_values, nsigma, npoints=ELLIPSE_POINTS):
+    """
+    Outline (x and y arrays) of the nsigma confidence ellipse of the points
+    (x_values, y_values)
+    """
+    x = np.asarray(x_values, dtype=float)[:, None]
+    y = np.asarray(y_values, dtype=float)[:, None]
+    outlines_x, outlines_y = _ellipse_outlines(x, y, (nsigma,), npoints)
+    return outlines_x[0, 0], outlines_y[0, 0]
 
-def confidence_ellipse(x_values, y_values, nsigma, npoints=300):
-    # Calculate center of confidence ellipse
-    mu_x, mu_y = np.mean(x_values), np.mean(y_values)
 
-    # Calculate correlation coefficient and covariances
-    cov_matrix = np.cov([x_values, y_values])
-    cov_xy = cov_matrix[0, 1]
-    sigma_x, sigma_y = np.sqrt(cov_matrix[0, 0]), np.sqrt(cov_matrix[1, 1])
-    rho = cov_xy / (sigma_x * sigma_y)
+def confidence_ellipses(meta, pairs, nsigmas=(2,), npoints=ELLIPSE_POINTS):
+    """
+    Outlines of the confidence ellipses of several (x column, y column) pairs
+    of meta and nsigma levels at once. For each pair, the rows where both
+    values are available are used.
 
-    # Get the x-y points for the default ellipse with a=sqrt(1+rho), b=sqrt(1-rho)
-    ellipse_x, ellipse_y = ellipse(np.sqrt(1 + rho), np.sqrt(1 - rho), npoints)
+    Returns a dictionary (x column, y column, nsigma) -> (x array, y array)
+    """
+    pairs, nsigmas = [tuple(pair) for pair in pairs], tuple(nsigmas)
+    x = meta[[x_col for x_col, _ in pairs]].to_numpy(dtype=float)
+    y = meta[[y_col for _, y_col in pairs]].to_numpy(dtype=float)
+    outlines_x, outlines_y = _ellipse_outlines(x, y, nsigmas, npoints)
+    return {
+        (x_col, y_col, nsigma): (outlines_x[i, j], outlines_y[i, j])
+        for i, (x_col, y_col) in enumerate(pairs)
+        for j, nsigma in enumerate(nsigmas)
+    }
+
+
+def _ellipse_outlines(x, y, nsigmas, npoints):
+    """
+    Outlines of the ellipses of each column of `x` and `y` (rows x pairs) and
+    each nsigma. Returns x and y arrays of shape pairs x nsigmas x npoints
+    (read-only, since they are memoised).
+    """
+    key = (
+        hashlib.sha1(x.tobytes() + y.tobytes()).hexdigest(),
+        x.shape,
+        nsigmas,
+        npoints,
+    )
+    if key in _ELLIPSES:
+        return _ELLIPSES[key]
+
+    # Mean, standard deviations and correlation coefficient of all pairs at once
+    valid = ~(np.isnan(x) | np.isnan(y))
+    n = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu_x = np.where(valid, x, 0).sum(axis=0) / n
+        mu_y = np.where(valid, y, 0).sum(axis=0) / n
+        dx, dy = np.where(valid, x - mu_x, 0), np.where(valid, y - mu_y, 0)
+        cov = np.stack([dx * dx, dy * dy, dx * dy]).sum(axis=1) / (n - 1)
+        sigma_x, sigma_y = np.sqrt(cov[0]), np.sqrt(cov[1])
+        rho = cov[2] / (sigma_x * sigma_y)
+
+        # Ellipse with semi-axes a=sqrt(1+rho) and b=sqrt(1-rho), parametrised by
+        # angle such that the points are spread along the whole outline
+        angle = np.linspace(0, 2 * np.pi, npoints)
+        u = np.sqrt(1 + rho)[:, None] * np.cos(angle)
+        v = np.sqrt(1 - rho)[:, None] * np.sin(angle)
 
     # Rotate ellipse 45 degrees counter-clockwise
-    ellipse_x, ellipse_y = rotate(ellipse_x, ellipse_y, np.pi / 4)
-
-    # Scale ellipse horizontally by (2*n*sigma_x) and vertically by (2*n*sigma_y)
-    # Note: scaling by 2*n*sigma_x means that the x_values (centered around 0) should
-    # be multiplied by n*sigma_x, not 2*n*sigma_x
-    ellipse_x = nsigma * sigma_x * ellipse_x
-    ellipse_y = nsigma * sigma_y * ellipse_y
+    unit_x, unit_y = (u - v) / np.sqrt(2), (u + v) / np.sqrt(2)
 
-    # Shift ellipse such that its center is situated at the point mu_x, mu_y
-    ellipse_x += mu_x
-    ellipse_y += mu_y
+    # Scale by n*sigma and shift the center to (mu_x, mu_y)
+    scale = np.asarray(nsigmas, dtype=float)[None, :, None]
+    outlines = (
+        mu_x[:, None, None] + scale * sigma_x[:, None, None] * unit_x[:, None],
+        mu_y[:, None, None] + scale * sigma_y[:, None, None] * unit_y[:, None],
+    )
+    for outline in outlines:
+        outline.setflags(write=False)
 
-    return ellipse_x, ellipse_y
+    if len(_ELLIPSES) >= ELLIPSE_CACHE_SIZE:
+        _ELLIPSES.pop(next(iter(_ELLIPSES)))
+    _ELLIPSES[key] = outlines
+    return outlines